@@ -1,10 +1,26 @@
 import os
-import yaml
-import subprocess
 import time
 from datetime import datetime
 from tabulate import tabulate
 import shutil
+import argparse
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from benchmark_index import load_index, load_meta, benchmark_entry, normalize_verdict
+from profiling import timed, add_phases, add_usage, phase_lines
+from goto_cache import goto_binary
+from scratch import scratch_dir, keep_files
+from verifier_process import run_command, hit_cpu_limit, cgroup_parent
+from cbmc_output import JsonUiParser, json_flags, json_outcome, text_outcome, solver_stats
+from job_planner import plan_jobs, property_pattern, map_job_verdicts, overall_verdict, overall_match
+from journal import open_journal, journal_append, read_journal, latest_by_key
+from unwinding import run_deepening, rounds_summary, start_unwind, unwind_factor, max_unwind
+from result_cache import cache_key, cache_get, cache_put, file_bytes, tool_version, prune_cache, stats_line, cache_dir
+from cost_model import (schedules, benchmark_features, fit_models, predict, job_timeout, schedule_jobs, open_history,
+                        record_run, prediction_stats)
+from sharding import parse_shard, shard_suffix, observed_runtimes, select_shard
 
 # simpler benchmarks
 #benchmark_dirs = [
@@ -17,24 +33,56 @@ import shutil
 benchmark_dirs = [
     'Lemur-program-verification/lemur/benchmarks/sv_comp/c/'
 ]
+cpachecker_timeout = 300 #seconds
+cbmc_timeout = 60 #seconds
+#scheduler settings, workers=1 keeps the old one-at-a-time behaviour
+num_workers = 1
+job_cpu_limit = None #cpu seconds per verifier process
+job_mem_limit = None #MB per verifier process
+use_cache = True #reuse verdicts for unchanged sources, properties, tool versions and flags
+#portfolio mode races CBMC against CPAchecker (and alternative CPAchecker configs) on every benchmark
+portfolio_cpachecker_configs = 1 #how many of the configs listed for a property in property_map to race
+cpachecker_class_cache = True #share one JVM class data archive between all CPAchecker runs
+#every CPAchecker run writes its output files into a private scratch directory that is removed afterwards
+cpachecker_scratch_root = None #where those go, None picks /dev/shm when it's writable and the temp directory if not
+cpachecker_lean_output = True #skip ARG, CFA, statistics and HTML report files, only counterexamples are written
+witness_dir = os.path.join(os.getcwd(), "cpachecker_witnesses") #output kept for FAILURE and mismatch results
+lean_output_options = {
+    'cpa.arg.export': 'false',
+    'cfa.export': 'false',
+    'cfa.exportPerFunction': 'false',
+    'cfa.callgraph.export': 'false',
+    'statistics.export': 'false',
+    'report.export': 'false',
+    'log.fileLevel': 'OFF'
+}
+cbmc_json_output = True #run CBMC with --json-ui and keep a parsed summary instead of its whole output
+goto_binaries = True #compile each source once with goto-cc and start every CBMC run from the stored binary
+#the cost model learns per-benchmark runtimes from earlier sweeps, see cost_model.py
+schedule = 'longest' #longest first, shortest first, or as many as fit in --time-budget
+adaptive_timeouts = False #cut each job's timeout down to what the cost model expects it to need
+#--passes screens every benchmark with a short timeout first and retries only these with the longer ones
+retried_labels = ('TIMEOUT', 'UNKNOWN')
+kill_slack = 5 #seconds a timed out benchmark may run past its timeout while its processes are taken down
+#verdicts that say more about the machine's load than the benchmark, never cached and ignored when an older
+#version cached them
+resource_verdicts = ('TIMEOUT', 'MEMOUT')
 
 def get_yml_files(directories):
     all_yml_files = []
+    entries = load_index(directories)
     for directory in directories:
-        if os.path.exists(directory) and os.path.isdir(directory):
-            yml_files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.yml')]
+        if os.path.isdir(directory):
+            yml_files = [entry['yml_path'] for entry in entries if entry['dir'] == directory]
             all_yml_files.extend(yml_files)
             print(f"Found {len(yml_files)} benchmark YAML files in {directory}")
-        else:
-            print(f"Warning: Directory {directory} does not exist or is not accessible")
     
     return all_yml_files
 
 def debug_yml_file(yml_path):
     #just extracting properties and verdicts of the .yml files
     try:
-        with open(yml_path, 'r') as f:
-            meta = yaml.safe_load(f)
+        meta = load_meta(yml_path)
         dir_path = os.path.dirname(yml_path)
         print(f"\nDebug info for {os.path.basename(yml_path)}:")
         print(f"From directory: {dir_path}")
@@ -60,13 +108,79 @@ def debug_yml_file(yml_path):
     except Exception as e:
         print(f"Error parsing {yml_path}: {str(e)}")
 
-def run_cpachecker_verification(yml_path, cpachecker_path=None):
+@lru_cache(maxsize=None)
+def find_cpachecker(cpachecker_path=None):
+    #returns (install dir, launcher) or (None, None), looked up once per run instead of once per benchmark
+    #main() calls this before the pool forks its workers, so they inherit the answer
+    if cpachecker_path is None:
+        cpachecker_script = shutil.which('cpachecker')
+        if cpachecker_script:
+            cpachecker_path = os.path.dirname(os.path.dirname(cpachecker_script))
+        else:
+            search_paths = [
+                os.path.join(os.getcwd(), "CPAchecker-2.2-unix"),
+                os.path.join(os.path.dirname(os.getcwd()), "CPAchecker-2.2-unix"),
+                "/opt/cpachecker",
+                os.path.expanduser("~/CPAchecker-2.2-unix")
+            ]
+            for path in search_paths:
+                if os.path.isdir(path):
+                    cpachecker_path = path
+                    break
+            if cpachecker_path is None:
+                return None, None
+    if os.path.isdir(cpachecker_path):
+        cpa_launcher = os.path.join(cpachecker_path, "scripts", "cpa.sh")
+        if not os.path.exists(cpa_launcher):
+            cpa_launcher = os.path.join(cpachecker_path, "bin", "cpachecker")
+    else:
+        cpa_launcher = cpachecker_path
+    return cpachecker_path, cpa_launcher
+
+@lru_cache(maxsize=None)
+def cpachecker_env(cpa_launcher):
+    #environment for the CPAchecker launcher, which passes JAVA_VM_ARGUMENTS on to the JVM
+    #with the class cache on, the first JVM to exit dumps the classes it loaded into a CDS archive and every
+    #later run maps that archive instead of loading and verifying the same classes again (needs JDK 19+,
+    #older JVMs ignore the options and start as before)
+    if not cpachecker_class_cache:
+        return None
+    archive_dir = os.path.join(cache_dir, "jvm")
+    archive = os.path.join(archive_dir, f"cpachecker-{cache_key(os.path.realpath(cpa_launcher))[:16]}.jsa")
+    if any(c.isspace() for c in archive):
+        #the launcher splits JAVA_VM_ARGUMENTS on whitespace
+        return None
+    os.makedirs(archive_dir, exist_ok=True)
+    vm_arguments = [os.environ.get('JAVA_VM_ARGUMENTS', ''), "-XX:+IgnoreUnrecognizedVMOptions",
+                    f"-XX:SharedArchiveFile={archive}", "-XX:+AutoCreateSharedArchive"]
+    env = dict(os.environ)
+    env['JAVA_VM_ARGUMENTS'] = ' '.join(arg for arg in vm_arguments if arg)
+    return env
+
+def keep_witness(output_dir, yml_path, config_index=0):
+    #copies a run's counterexample files (everything with full output) to witness_dir, returns where they went
+    name = os.path.basename(yml_path).replace('.yml', '')
+    if config_index:
+        name = f"{name}-config{config_index + 1}"
+    target = os.path.join(witness_dir, os.path.basename(os.path.dirname(yml_path)), name)
+    shutil.rmtree(target, ignore_errors=True)
+    if cpachecker_lean_output:
+        kept = keep_files(output_dir, target, lambda path: 'counterexample' in path.lower() or 'witness' in path.lower())
+    else:
+        kept = keep_files(output_dir, target)
+    return target if kept else None
+
+def run_cpachecker_verification(yml_path, cpachecker_path=None, limits=None, cache=True, config_index=0, cancel=None,
+                                timeout=None):
+    #timeout overrides cpachecker_timeout for this benchmark, e.g. an adaptive one from the cost model
+    timeout = timeout or cpachecker_timeout
     
     dir_path = os.path.dirname(yml_path)
+    phases = {}
     #some debugging in case the fails to be loaded
     try:
-        with open(yml_path, 'r') as f:
-            meta = yaml.safe_load(f)
+        with timed(phases, 'yaml_parse'):
+            meta = load_meta(yml_path)
     except Exception as e:
         print(f"Error loading YAML file {yml_path}: {str(e)}")
         return {
@@ -103,47 +217,27 @@ def run_cpachecker_verification(yml_path, cpachecker_path=None):
             'output': f"Input file not found: {c_file}",
             'additional_info': ''
         }
-    #looking for cpachecker implementation
+    cpachecker_path, cpa_launcher = find_cpachecker(cpachecker_path)
     if cpachecker_path is None:
-        cpachecker_script = shutil.which('cpachecker')
-        if cpachecker_script:
-            cpachecker_path = os.path.dirname(os.path.dirname(cpachecker_script))
-        else:
-            search_paths = [
-                os.path.join(os.getcwd(), "CPAchecker-2.2-unix"),
-                os.path.join(os.path.dirname(os.getcwd()), "CPAchecker-2.2-unix"),
-                "/opt/cpachecker",
-                os.path.expanduser("~/CPAchecker-2.2-unix")
-            ]
-            for path in search_paths:
-                if os.path.isdir(path):
-                    cpachecker_path = path
-                    break
-            if cpachecker_path is None:
-                return {
-                    'benchmark_dir': os.path.basename(dir_path),
-                    'cpa_verdict': 'ERROR',
-                    'expected_verdicts': [],
-                    'properties': [],
-                    'time': 0,
-                    'match': "ERROR",
-                    'output': "CPAchecker not found",
-                    'additional_info': ''
-                }
-    if os.path.isdir(cpachecker_path):
-        cpa_launcher = os.path.join(cpachecker_path, "scripts", "cpa.sh")
-        if not os.path.exists(cpa_launcher):
-            cpa_launcher = os.path.join(cpachecker_path, "bin", "cpachecker")
-    else:
-        cpa_launcher = cpachecker_path
+        return {
+            'benchmark_dir': os.path.basename(dir_path),
+            'cpa_verdict': 'ERROR',
+            'expected_verdicts': [],
+            'properties': [],
+            'time': 0,
+            'match': "ERROR",
+            'output': "CPAchecker not found",
+            'additional_info': ''
+        }
     properties = meta.get('properties', [])
-    output_dir = os.path.join(os.getcwd(), "cpachecker_output")
-    os.makedirs(output_dir, exist_ok=True)
     config_dir = os.path.join(cpachecker_path, "config")
     #mapping .yml properties to CPAchecker properties
     property_map = {
         'no-overflow': [os.path.join(config_dir, "default--overflow.properties")],
-        'unreach-call': [os.path.join(config_dir, "default.properties")],
+        'unreach-call': [os.path.join(config_dir, "default.properties"),
+                         os.path.join(config_dir, "predicateAnalysis.properties"),
+                         os.path.join(config_dir, "valueAnalysis.properties"),
+                         os.path.join(config_dir, "kInduction.properties")],
         'valid-deref': [os.path.join(config_dir, "predicateAnalysis-PredAbsRefiner-ABEl-UF.properties")],
         'valid-free': [os.path.join(config_dir, "predicateAnalysis-PredAbsRefiner-ABEl-UF.properties")],
         'valid-memtrack': [os.path.join(config_dir, "predicateAnalysis-PredAbsRefiner-ABEl-UF.properties")],
@@ -154,6 +248,7 @@ def run_cpachecker_verification(yml_path, cpachecker_path=None):
 
     found_properties = []
     config_file = None
+    config_options = None
     spec_file = None
     for prop in properties:
         prop_file = prop.get('property_file', '')
@@ -161,12 +256,25 @@ def run_cpachecker_verification(yml_path, cpachecker_path=None):
         for pattern, config in property_map.items():
             if pattern in prop_file:
                 found_properties.append(pattern)
-                if config_file is None:
-                    config_file = config[0]
+                if config_options is None:
+                    config_options = config
                 spec_file = abs_prop_file
                 break
-    if config_file is None:
-        config_file = os.path.join(config_dir, "default.properties")
+    if config_options is None:
+        config_options = [os.path.join(config_dir, "default.properties")]
+    if config_index >= len(config_options):
+        #portfolio asked for an alternative config this property doesn't have
+        return {
+            'benchmark_dir': os.path.basename(dir_path),
+            'cpa_verdict': 'SKIPPED',
+            'expected_verdicts': [],
+            'properties': found_properties,
+            'time': 0,
+            'match': "UNKNOWN",
+            'output': f"No config number {config_index + 1} for {', '.join(found_properties) or 'default'}",
+            'additional_info': ''
+        }
+    config_file = config_options[config_index]
     expected_verdicts = []
     for prop in properties:
         raw_verdict = prop.get('expected_verdict')
@@ -183,18 +291,90 @@ def run_cpachecker_verification(yml_path, cpachecker_path=None):
                 'verdict': bool_verdict
             })
     cmd = [cpa_launcher, "-config", config_file]
+    #the JVM reserves far more address space than it uses, so memory is capped through the heap size instead
+    if limits and limits.get('mem') is not None:
+        cmd.extend(["-heap", f"{int(limits['mem'])}m"])
     if spec_file:
         cmd.extend(["-spec", spec_file])
-    cmd.extend(["-setprop", f"output.path={output_dir}", "-setprop", "analysis.timeLimit=900s", c_file])
-    print(f"\nRunning: {' '.join(cmd)}")
+    cmd.extend(["-setprop", "analysis.timeLimit=900s"])
+    if cpachecker_lean_output:
+        for option, value in lean_output_options.items():
+            cmd.extend(["-setprop", f"{option}={value}"])
+    with timed(phases, 'file_read'):
+        source = file_bytes(c_file)
+    #the key covers everything that can change the verdict, but not the paths, so moved files still hit
+    #the timeout isn't part of it, a timed out run is never cached and a verdict holds under any timeout
+    key = cache_key('cpachecker', tool_version(cpa_launcher, '-version'), os.path.basename(config_file),
+                    file_bytes(config_file), file_bytes(spec_file) if spec_file else b'', source,
+                    properties, limits)
+    cached = cache_get(key) if cache else None
+    if cached is not None and cached['cpa_verdict'] in resource_verdicts:
+        cached = None
+    if cached is not None:
+        print(f"\nCache hit: {c_file}")
+        cached['benchmark_dir'] = os.path.basename(dir_path)
+        cached['cached'] = True
+        cached['phases'] = phases
+        return cached
+    print(f"\nRunning: {' '.join(cmd + [c_file])}")
     start_time = time.time()
-    try:
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=300)
-        output = result.stdout + '\n' + result.stderr
-        execution_time = time.time() - start_time
-    except subprocess.TimeoutExpired:
+    usage = {}
+    witness = None
+    with scratch_dir("cpachecker-", cpachecker_scratch_root) as output_dir:
+        returncode, stdout, stderr, status = run_command(cmd + ["-setprop", f"output.path={output_dir}", c_file],
+                                                         timeout, limits, address_space=False, cancel=cancel,
+                                                         env=cpachecker_env(cpa_launcher), usage=usage)
+        output = stdout + '\n' + stderr
         execution_time = time.time() - start_time
+        with timed(phases, 'output_parse'):
+            if "Verification result: TRUE" in output:
+                cpa_verdict = "SUCCESS"
+            elif "Verification result: FALSE" in output or "Error location(s) reached" in output:
+                cpa_verdict = "FAILURE"
+            else:
+                cpa_verdict = "UNKNOWN"
+        if len(expected_verdicts) == 0:
+            match = "UNKNOWN"
+        else:
+            expected_overall = all(v['verdict'] for v in expected_verdicts)
+            actual_success = cpa_verdict == "SUCCESS"
+            match = actual_success == expected_overall
+        #only the output of counterexamples and wrong verdicts is worth looking at later, the rest goes with the
+        #scratch directory
+        if status == 'done' and cpa_verdict != "UNKNOWN" and (cpa_verdict == "FAILURE" or match is False):
+            witness = keep_witness(output_dir, yml_path, config_index)
+    add_usage(phases, usage)
+    if status == 'cancelled':
+        #lost a portfolio race, not cached since it says nothing about the benchmark
         return {
+            'benchmark_dir': os.path.basename(dir_path),
+            'cpa_verdict': 'CANCELLED',
+            'expected_verdicts': expected_verdicts,
+            'properties': found_properties,
+            'time': execution_time,
+            'match': "UNKNOWN",
+            'output': "CPAchecker cancelled",
+            'additional_info': '',
+            'phases': phases
+        }
+    #before the CPU limit check, a cgroup OOM kill is a SIGKILL too and would otherwise look like a timeout
+    #CPAchecker catches the JVM's OutOfMemoryError itself and can exit normally without a verdict
+    if status == 'memout' or ('OutOfMemoryError' in output and "Verification result: TRUE" not in output
+                              and "Verification result: FALSE" not in output):
+        memout_result = {
+            'benchmark_dir': os.path.basename(dir_path),
+            'cpa_verdict': 'MEMOUT',
+            'expected_verdicts': expected_verdicts,
+            'properties': found_properties,
+            'time': execution_time,
+            'match': "MEMOUT",
+            'output': "CPAchecker ran out of memory",
+            'additional_info': '',
+            'phases': phases
+        }
+        return memout_result
+    if status == 'timeout' or hit_cpu_limit(returncode, limits):
+        timeout_result = {
             'benchmark_dir': os.path.basename(dir_path),
             'cpa_verdict': 'TIMEOUT',
             'expected_verdicts': expected_verdicts,
@@ -202,24 +382,14 @@ def run_cpachecker_verification(yml_path, cpachecker_path=None):
             'time': execution_time,
             'match': "TIMEOUT",
             'output': "CPAchecker timed out",
-            'additional_info': ''
+            'additional_info': '',
+            'phases': phases
         }
-    if "Verification result: TRUE" in output:
-        cpa_verdict = "SUCCESS"
-    elif "Verification result: FALSE" in output or "Error location(s) reached" in output:
-        cpa_verdict = "FAILURE"
-    else:
-        cpa_verdict = "UNKNOWN"
+        return timeout_result
+    if cpa_verdict == "UNKNOWN":
         print(f"Warning: CPAchecker output unclear for {c_file}")
         print(f"Output snippet: {output[:200]}...")
-    if len(expected_verdicts) == 0:
-        match = "UNKNOWN"
-    else:
-        expected_overall = all(v['verdict'] for v in expected_verdicts)
-        actual_success = cpa_verdict == "SUCCESS"
-        match = actual_success == expected_overall
-
-    return {
+    verification_result = {
         'benchmark_dir': os.path.basename(dir_path),
         'cpa_verdict': cpa_verdict,
         'expected_verdicts': expected_verdicts,
@@ -227,15 +397,22 @@ def run_cpachecker_verification(yml_path, cpachecker_path=None):
         'time': execution_time,
         'match': match,
         'output': output,
+        'phases': phases
     }
+    if witness:
+        verification_result['witness'] = witness
+    if cache:
+        cache_put(key, verification_result)
+    return verification_result
 
 
-def run_cbmc_verification(yml_path):
+def run_cbmc_verification(yml_path, limits=None, cache=True, cancel=None, deepening=False, timeout=None):
     #very similar to cpachecker but instead for cbmc
     dir_path = os.path.dirname(yml_path)
+    phases = {}
     try:
-        with open(yml_path, 'r') as f:
-            meta = yaml.safe_load(f)
+        with timed(phases, 'yaml_parse'):
+            meta = load_meta(yml_path)
     except Exception as e:
         print(f"Error loading YAML file {yml_path}: {str(e)}")
         return {
@@ -275,13 +452,9 @@ def run_cbmc_verification(yml_path):
     properties = meta.get('properties', [])
     
     # Determine the appropriate CBMC flags based on benchmark directory and file extension
+    #every job keeps the unwinding assertions, so a SUCCESS means the property holds and not just that it holds
+    #in the first 50 iterations, for termination they are the whole check
     cbmc_flags = ['--unwind', '50', '--no-standard-checks', '--unwinding-assertions']
-    #additional properties to check for float
-    if 'float' in dir_path.lower():
-        cbmc_flags.extend(['--float-div-by-zero-check', '--floatbv'])
-    #additional properties to check for loops
-    if 'loop' in dir_path.lower():
-        cbmc_flags.extend(['--bounds-check', '--pointer-check'])
     property_map = {
         'no-overflow': ['--signed-overflow-check', '--unsigned-overflow-check'],
         'unreach-call': [],
@@ -292,21 +465,23 @@ def run_cbmc_verification(yml_path):
         'memory-safety': ['--pointer-check', '--memory-leak-check', '--bounds-check'],
         'coverage': []  
     }
+    #the directory heuristics only go to the jobs of the properties they check
+    #additional properties to check for float
+    if 'float' in dir_path.lower():
+        property_map['unreach-call'] = property_map['unreach-call'] + ['--float-div-by-zero-check', '--floatbv']
+    #additional properties to check for loops
+    if 'loop' in dir_path.lower():
+        for pattern in ('valid-deref', 'valid-free', 'valid-memtrack', 'memory-safety'):
+            property_map[pattern] = property_map[pattern] + ['--bounds-check', '--pointer-check']
     found_properties = []
     for prop in properties:
         prop_file = prop.get('property_file', '')
-        found_property = False
-        for pattern, flags in property_map.items():
-            if pattern in prop_file:
-                found_property = True
-                found_properties.append(pattern)
-                for flag in flags:
-                    if flag not in cbmc_flags:
-                        cbmc_flags.append(flag)
-                if pattern == 'coverage':
-                    print(f"Skipping coverage properties (unsupported)")
-                break
-        if not found_property and prop_file:
+        pattern = property_pattern(prop_file, property_map)
+        if pattern is not None:
+            found_properties.append(pattern)
+            if pattern == 'coverage':
+                print(f"Skipping coverage properties (unsupported)")
+        elif prop_file:
             print(f"Unknown property: {prop_file}")
     expected_verdicts = []
     for prop in properties:
@@ -325,171 +500,830 @@ def run_cbmc_verification(yml_path):
                 'verdict': bool_verdict
             })
 
-    #actually run CBMC
-    cmd = ['cbmc', c_file] + cbmc_flags
-    print(f"\nRunning: {' '.join(cmd)}")
-    start_time = time.time()
-    try:
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=60)
-        output = result.stdout + '\n' + result.stderr
-        execution_time = time.time() - start_time
-    except subprocess.TimeoutExpired:
-        execution_time = time.time() - start_time
+    #one CBMC job per distinct flag set, properties that need exactly the same flags share one run
+    jobs, assignment = plan_jobs(properties, cbmc_flags, property_map)
+    planned = sum(job is not None for job in assignment)
+    if planned > len(jobs):
+        print(f"{planned} properties share {len(jobs)} CBMC run(s)")
+    #the jobs run one after another within the benchmark's one timeout, each gets what the earlier ones left
+    deadline = time.time() + (timeout or cbmc_timeout)
+    job_results = []
+    for job in jobs:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            job_results.append({'verdict': 'TIMEOUT', 'time': 0.0, 'output': "CBMC not run, benchmark timeout spent",
+                                'rounds': None, 'cached': False, 'phases': {}})
+            continue
+        job_result = run_cbmc_job(c_file, job['flags'], limits, cache, cancel, deepening, remaining)
+        job_results.append(job_result)
+        if job_result['verdict'] == 'CANCELLED':
+            break
+    execution_time = sum(r['time'] for r in job_results)
+    for job_result in job_results:
+        add_phases(phases, job_result['phases'])
+    if job_results and job_results[-1]['verdict'] == 'CANCELLED':
         return {
             'benchmark_dir': os.path.basename(dir_path),
-            'cbmc_verdict': 'TIMEOUT',
+            'cbmc_verdict': 'CANCELLED',
             'expected_verdicts': expected_verdicts,
             'properties': found_properties,
             'time': execution_time,
-            'match': "TIMEOUT",
-            'output': "CBMC timed out"
+            'match': "UNKNOWN",
+            'output': "CBMC cancelled",
+            'phases': phases
         }
-    cbmc_success = "VERIFICATION SUCCESSFUL" in output
-    cbmc_failure = "VERIFICATION FAILED" in output
-    if cbmc_success:
-        cbmc_verdict = "SUCCESS"
-    elif cbmc_failure:
-        cbmc_verdict = "FAILURE"
-    else:
-        print(f"Warning: CBMC output unclear for {c_file}")
-        print(f"Output snippet: {output[:200]}...")
-        cbmc_verdict = "UNKNOWN"
+    property_results = map_job_verdicts(properties, assignment, [r['verdict'] for r in job_results],
+                                        normalize_verdict)
+    cbmc_verdict = overall_verdict([p['verdict'] for p in property_results])
+    match = overall_match(property_results)
     if len(expected_verdicts) == 0:
-        match = "UNKNOWN" 
         print(f"No expected verdicts to compare against")
     else:
-        expected_overall = all(v['verdict'] for v in expected_verdicts)
-        actual_success = cbmc_verdict == "SUCCESS"
-        if cbmc_verdict == "UNKNOWN":
-            match = "UNKNOWN"
-        else:
-            match = actual_success == expected_overall
-        print(f"Expected verdict(s): {', '.join([str(v['raw_verdict']) for v in expected_verdicts])}")
-        print(f"Converted to: {expected_overall}")
+        for p in [p for p in property_results if p['verdict'] != 'SKIPPED']:
+            print(f"{os.path.basename(p['property'])}: expected {p['expected']}, CBMC {p['verdict']}, match {p['match']}")
         print(f"CBMC verdict: {cbmc_verdict}")
         print(f"Match: {match}")
-
+    if len(job_results) == 1:
+        output = job_results[0]['output']
+    else:
+        output = "\n".join(f"=== cbmc {' '.join(job['flags'])} ===\n{r['output']}" for job, r in zip(jobs, job_results))
+    rounds = [r for job_result in job_results for r in (job_result['rounds'] or [])]
     return {
         'benchmark_dir': os.path.basename(dir_path),
         'cbmc_verdict': cbmc_verdict,
         'expected_verdicts': expected_verdicts,
         'properties': found_properties,
+        'property_results': property_results,
+        'jobs': len(jobs),
         'time': execution_time,
         'match': match,
-        'output': output
+        'output': output,
+        'rounds': rounds or None,
+        'cached': bool(job_results) and all(r['cached'] for r in job_results),
+        'phases': phases,
+        'cbmc_stats': solver_stats([r.get('cbmc') for r in job_results])
     }
 
-yml_files = get_yml_files(benchmark_dirs)
-if not yml_files:
-    print("No benchmark YAML files found in the specified directories.")
-    exit(1)
-for i, yml_file in enumerate(yml_files[:5]):
-    debug_yml_file(yml_file)
-    if i >= 4: 
-        print(f"\n({len(yml_files) - 5} more files not shown)")
-        break
-results = []
-print(f"\nVerifying {len(yml_files)} benchmarks\n")
-matches = 0
-mismatches = 0
-timeouts = 0
-unknowns = 0
-errors = 0
-for yml_path in yml_files:
-    base_name = os.path.basename(yml_path).replace('.yml', '')
-    print(f"\nVerifying {base_name}...")
-    result = run_cpachecker_verification(yml_path)
-    expected_str = ", ".join([f"{os.path.basename(v['property'])}: {v['raw_verdict']}" 
-                             for v in result['expected_verdicts']]) if result['expected_verdicts'] else "N/A"                  
-    properties_str = ", ".join(result['properties']) if result['properties'] else "N/A"
-    match_status = result['match']
+def run_cbmc_job(c_file, flags, limits=None, cache=True, cancel=None, deepening=False, timeout=None):
+    #one CBMC run (or one deepening sequence) with a fixed flag set, returns verdict, time, output and rounds
+    #cached on the source and the flags only, so any property or benchmark needing the same run reuses it
+    #with cbmc_json_output the result has a compact 'cbmc' summary and output is its one-line text
+    #timeout overrides cbmc_timeout for this job, it isn't part of the key since timeouts aren't cached
+    timeout = timeout or cbmc_timeout
+    if cbmc_json_output:
+        flags = flags + json_flags
+    cmd = ['cbmc', c_file] + flags
+    deepening_settings = [start_unwind, unwind_factor, max_unwind] if deepening else None
+    phases = {}
+    with timed(phases, 'file_read'):
+        source = file_bytes(c_file)
+    key = cache_key('cbmc-job', tool_version('cbmc'), flags, source, limits, deepening_settings)
+    cached = cache_get(key) if cache else None
+    if cached is not None and cached['verdict'] in resource_verdicts:
+        cached = None
+    if cached is not None:
+        print(f"\nCache hit: {' '.join(cmd)}")
+        cached['cached'] = True
+        cached['phases'] = phases
+        return cached
+    summaries = []
+    def run(run_cmd, remaining):
+        #CBMC's JSON is parsed while it is being written, only the summary is kept
+        usage = {}
+        parser = JsonUiParser() if cbmc_json_output else None
+        def feed(chunk):
+            with timed(phases, 'output_parse'):
+                parser.feed(chunk)
+        returncode, stdout, stderr, status = run_command(run_cmd, remaining, limits, cancel=cancel, usage=usage,
+                                                         stdout_sink=feed if parser else None)
+        add_usage(phases, usage)
+        if status == 'done' and hit_cpu_limit(returncode, limits):
+            status = 'timeout'
+        if parser:
+            summaries.append(parser.summary())
+            stdout = summaries[-1]
+        return returncode, stdout, stderr, status
+    outcome = json_outcome if cbmc_json_output else text_outcome
+    start_time = time.time()
+    def attempt(program):
+        #(verdict, output, rounds, status) of CBMC on program, the source or its goto-binary
+        #compiling the goto-binary counts against the job's timeout like the CBMC run itself
+        remaining = timeout - (time.time() - start_time)
+        if deepening:
+            verdict, output, rounds = run_deepening(program, flags, remaining, run, outcome=outcome)
+            print(f"Unwind rounds: {rounds_summary(rounds)}")
+            status = verdict.lower() if verdict in ('TIMEOUT', 'MEMOUT', 'CANCELLED') else 'done'
+            return verdict, output, rounds, status
+        cmd = ['cbmc', program] + flags
+        print(f"\nRunning: {' '.join(cmd)}")
+        returncode, stdout, stderr, status = run(cmd, remaining)
+        with timed(phases, 'output_parse'):
+            verdict, _, output = outcome(stdout, stderr)
+        return verdict, output, None, status
+    program = c_file
+    if goto_binaries:
+        #the verdict cache stays keyed on the source, a binary gives the same result as the source it came from
+        with timed(phases, 'frontend'):
+            program = goto_binary(c_file, flags, source) or c_file
+    verdict, output, rounds, status = attempt(program)
+    if (program != c_file and status == 'done' and verdict not in ('SUCCESS', 'FAILURE')
+            and not os.path.exists(program)):
+        #prune_cache evicted the binary before CBMC read it, that error says nothing about the source
+        print(f"goto-binary of {c_file} was evicted during the run, running CBMC on the source")
+        verdict, output, rounds, status = attempt(c_file)
+    execution_time = time.time() - start_time
+    summary = summaries[-1] if summaries else None
+    if status == 'cancelled':
+        return {'verdict': 'CANCELLED', 'time': execution_time, 'output': "CBMC cancelled", 'rounds': rounds,
+                'cached': False, 'phases': phases}
+    if status in ('timeout', 'memout'):
+        return {'verdict': status.upper(), 'time': execution_time,
+                'output': "CBMC timed out" if status == 'timeout' else "CBMC ran out of memory", 'rounds': rounds,
+                'cached': False, 'phases': phases, 'cbmc': summary}
+    if verdict == "UNKNOWN" and not deepening:
+        print(f"Warning: CBMC output unclear for {c_file}")
+        print(f"Output snippet: {output[:200]}...")
+    job_result = {'verdict': verdict, 'time': execution_time, 'output': output, 'rounds': rounds, 'cached': False,
+                  'phases': phases, 'cbmc': summary}
+    if cache:
+        cache_put(key, job_result)
+    return job_result
+
+def expected_cost(yml_path):
+    #rough guess of how long a benchmark will take, bigger sources with more properties run longer
+    entry = benchmark_entry(yml_path)
+    if entry['input_stamp'] is None:
+        return 0
+    return entry['input_stamp'][1] * max(1, len(entry['properties']))
+
+def run_portfolio(yml_path, limits=None, cache=True, cpachecker_configs=portfolio_cpachecker_configs, deepening=False):
+    #races CBMC and CPAchecker on one benchmark, the first SUCCESS/FAILURE wins and the rest are killed
+    #returns a CPAchecker-shaped result so it drops into the same report, plus the winner and reclaimed time
+    cancel = threading.Event()
+    entrants = {'cbmc': (cbmc_timeout, lambda: run_cbmc_verification(yml_path, limits, cache, cancel=cancel,
+                                                                      deepening=deepening))}
+    for index in range(max(1, cpachecker_configs)):
+        name = 'cpachecker' if index == 0 else f"cpachecker#{index + 1}"
+        entrants[name] = (cpachecker_timeout, lambda index=index: run_cpachecker_verification(
+            yml_path, limits=limits, cache=cache, config_index=index, cancel=cancel))
+    start_time = time.time()
+    winner = None
+    finished = {}
+    with ThreadPoolExecutor(max_workers=len(entrants)) as pool:
+        futures = {pool.submit(run): name for name, (_, run) in entrants.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            result = future.result()
+            result['verdict'] = result_verdict(result)
+            finished[name] = result
+            if winner is None and result['verdict'] in ("SUCCESS", "FAILURE"):
+                winner = name
+                cancel.set()
+    wall_time = time.time() - start_time
+    #budget the killed runs still had left, an upper bound on what racing saved over waiting for them
+    time_saved = sum(max(0, entrants[name][0] - result['time'])
+                     for name, result in finished.items() if result['verdict'] == 'CANCELLED')
+    if winner is None:
+        #nobody reached a verdict, report the default CPAchecker run
+        winner_result = finished['cpachecker']
+        verdict = winner_result['verdict']
+    else:
+        winner_result = finished[winner]
+        verdict = f"{winner_result['verdict']} ({winner})"
+    reference = finished['cpachecker']
+    #every entrant's phases, the losers' solver time was spent too
+    phases = {}
+    for result in finished.values():
+        add_phases(phases, result.get('phases'))
+    return {
+        'benchmark_dir': reference['benchmark_dir'],
+        'cpa_verdict': verdict,
+        'expected_verdicts': reference['expected_verdicts'] or winner_result['expected_verdicts'],
+        'properties': reference['properties'],
+        'time': wall_time,
+        'match': winner_result['match'],
+        'output': winner_result['output'],
+        'winner': winner,
+        'time_saved': time_saved,
+        'cached': winner_result.get('cached'),
+        'rounds': winner_result.get('rounds'),
+        'property_results': winner_result.get('property_results'),
+        'jobs': winner_result.get('jobs'),
+        'phases': phases,
+        'cbmc_stats': winner_result.get('cbmc_stats'),
+        'witness': winner_result.get('witness')
+    }
+
+def result_verdict(result):
+    return result.get('cpa_verdict', result.get('cbmc_verdict'))
+
+def verify_job(yml_path, options):
+    #options: limits, cache, tool ('cpachecker' or 'cbmc'), deepening (CBMC unwind deepening) and
+    #portfolio (number of CPAchecker configs to race against CBMC, None runs the tool alone)
+    #and timeouts (per-benchmark timeouts from the cost model, the tool's default for missing benchmarks)
+    timeout = (options.get('timeouts') or {}).get(yml_path)
+    if options.get('portfolio'):
+        return yml_path, run_portfolio(yml_path, options.get('limits'), options.get('cache', True),
+                                       options['portfolio'], options.get('deepening', False))
+    if options.get('tool') == 'cbmc':
+        return yml_path, run_cbmc_verification(yml_path, options.get('limits'), options.get('cache', True),
+                                               deepening=options.get('deepening', False), timeout=timeout)
+    return yml_path, run_cpachecker_verification(yml_path, limits=options.get('limits'), cache=options.get('cache', True),
+                                                 timeout=timeout)
+
+def verify_all(yml_files, workers=1, options=None):
+    #yields (yml_path, result) as soon as each benchmark finishes, jobs are started in the order given
+    options = options or {}
+    if workers <= 1:
+        for yml_path in yml_files:
+            print(f"\nVerifying {os.path.basename(yml_path).replace('.yml', '')}...")
+            yield verify_job(yml_path, options)
+        return
+    #fork so the workers don't re-run this script on startup
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(verify_job, yml_path, options): yml_path for yml_path in yml_files}
+        for future in as_completed(futures):
+            yml_path = futures[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                yield yml_path, {
+                    'benchmark_dir': os.path.basename(os.path.dirname(yml_path)),
+                    'cpa_verdict': 'ERROR',
+                    'expected_verdicts': [],
+                    'properties': [],
+                    'time': 0,
+                    'match': "ERROR",
+                    'output': f"Worker failed: {str(e)}",
+                    'additional_info': ''
+                }
+
+def match_label(match_status):
     if match_status == "TIMEOUT":
-        match_str = "TIMEOUT"
-        timeouts += 1
+        return "TIMEOUT"
+    elif match_status == "MEMOUT":
+        return "MEMOUT"
     elif match_status == "UNKNOWN":
-        match_str = "UNKNOWN"
-        unknowns += 1
+        return "UNKNOWN"
     elif match_status == "ERROR":
-        match_str = "ERROR"
-        errors += 1
+        return "ERROR"
     elif match_status:
-        match_str = "MATCH"
-        matches += 1
+        return "MATCH"
     else:
-        match_str = "MISMATCH"
-        mismatches += 1
-        print(f"\n Mismatch for: {base_name}")
-        print(f" Expected: {expected_str}")
-        print(f" CPA said: {result['cpa_verdict']}")
-    results.append([
+        return "MISMATCH"
+
+def timeout_list(text):
+    #"10,60,300" as an argparse type, growing timeouts in seconds
+    try:
+        timeouts = [float(part) for part in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated seconds, got {text!r}")
+    if any(t <= 0 for t in timeouts) or timeouts != sorted(timeouts):
+        raise argparse.ArgumentTypeError(f"pass timeouts must be positive and increasing, got {text}")
+    return timeouts
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verify sv-benchmarks YAML tasks with CPAchecker")
+    parser.add_argument('--workers', type=int, default=num_workers,
+                        help="number of benchmarks verified in parallel (0 = one per CPU)")
+    parser.add_argument('--cpu-limit', type=float, default=job_cpu_limit,
+                        help="CPU seconds allowed per verifier process")
+    parser.add_argument('--mem-limit', type=int, default=job_mem_limit,
+                        help="memory in MB allowed per verifier process")
+    parser.add_argument('--no-cache', action='store_true', default=not use_cache,
+                        help="ignore cached verdicts and re-run every verifier")
+    parser.add_argument('--tool', choices=['cpachecker', 'cbmc'], default='cpachecker',
+                        help="verifier to run when not in portfolio mode")
+    parser.add_argument('--unwind-deepening', action='store_true',
+                        help="run CBMC with a growing unwind bound instead of a fixed --unwind 50")
+    parser.add_argument('--portfolio', action='store_true',
+                        help="race CBMC and CPAchecker on every benchmark and keep the first definitive verdict")
+    parser.add_argument('--portfolio-configs', type=int, default=portfolio_cpachecker_configs,
+                        help="CPAchecker configs per property to race in portfolio mode")
+    parser.add_argument('--schedule', choices=schedules, default=schedule,
+                        help="job order from the predicted runtimes: longest first, shortest first for quick "
+                             "feedback, or budget to run only what fits in --time-budget")
+    parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+                        help="wall time the sweep should fit in with --schedule budget")
+    parser.add_argument('--adaptive-timeouts', action='store_true', default=adaptive_timeouts,
+                        help="give each benchmark a timeout from its predicted runtime instead of the fixed one")
+    parser.add_argument('--passes', type=timeout_list, metavar='T1,T2,...',
+                        help="per-benchmark timeouts of successive passes, the first runs everything and each later "
+                             "one only the benchmarks still TIMEOUT or UNKNOWN (replaces the tool timeout)")
+    parser.add_argument('--max-wall', type=float, metavar='SECONDS',
+                        help="wall-clock cap for --passes, later passes only retry what fits in the time left")
+    parser.add_argument('--resume', metavar='JOURNAL',
+                        help="continue a sweep from its journal, skipping benchmarks already recorded there")
+    parser.add_argument('--report-from-journal', metavar='JOURNAL',
+                        help="only rebuild the text and CSV reports from a journal")
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help="verify only shard I of N, the shards together cover every benchmark once")
+    parser.add_argument('--merge', nargs='+', metavar='FILE',
+                        help="only build one report from the journals (or report CSVs) of several CBMC.py shards")
+    return parser.parse_args()
+
+def result_row(base_name, result, match_str):
+    verdict = result_verdict(result)
+    if result.get('rounds'):
+        verdict = f"{verdict} (unwind {result['rounds'][-1]['unwind']})"
+    expected_str = ", ".join([f"{os.path.basename(v['property'])}: {v['raw_verdict']}" 
+                             for v in result['expected_verdicts']]) if result['expected_verdicts'] else "N/A"                  
+    properties_str = ", ".join(result['properties']) if result['properties'] else "N/A"
+    return [
         base_name,
         result['benchmark_dir'],
         properties_str,
         expected_str,
-        result['cpa_verdict'],
+        verdict,
         f"{result['time']:.2f}s",
         match_str
-    ])
-results.sort(key=lambda x: (
-    0 if "ERROR" in x[6] else (
-        1 if "MISMATCH" in x[6] else (
-            2 if "UNKNOWN" in x[6] else (
-                3 if "TIMEOUT" in x[6] else 4
-            )
-        )
-    ), 
-    x[1], 
-    x[0] 
-))
-
-#creating a table
-timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-report_filename = f"verification_report_{timestamp}.txt"
-headers = ["Benchmark", "Directory", "Properties", "Expected Verdict", "CPAChecker Verdict", "Time", "Match Status"]
-table = tabulate(results, headers=headers, tablefmt="grid")
-with open(report_filename, "w") as f:
-    f.write(f"CBMC Verification Report - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-    f.write(table)
-    f.write(f"\n\nSummary: {matches} matches, {mismatches} mismatches, {timeouts} timeouts, {unknowns} unknowns, {errors} errors\n")
-print(f"\nSummary")
-print(f"{matches} matches, {mismatches} mismatches, {timeouts} timeouts, {unknowns} unknowns, {errors} errors")
-print(f"Report saved to {report_filename}")
-#creating a csv
-csv_filename = f"verification_report_{timestamp}.csv"
-with open(csv_filename, "w") as f:
-    f.write(",".join(headers) + "\n")
-    for row in results:
-        cleaned_row = [str(cell).replace(",", ";") for cell in row]
-        f.write(",".join(cleaned_row) + "\n")
-print(f"CSV saved to {csv_filename}")
-directory_stats = {}
-for result in results:
-    directory = result[1]
-    status = result[6]
-    if directory not in directory_stats:
-        directory_stats[directory] = {
-            'MATCH': 0, 'MISMATCH': 0, 'TIMEOUT': 0, 'UNKNOWN': 0, 'ERROR': 0, 'total': 0
-        }
-    directory_stats[directory][status] += 1
-    directory_stats[directory]['total'] += 1
-print("\nResults by Directory")
-dir_table = []
-for directory, stats in directory_stats.items():
-    success_rate = (stats['MATCH'] / stats['total'] * 100) if stats['total'] > 0 else 0
-    dir_table.append([
-        directory,
-        stats['total'],
-        stats['MATCH'],
-        stats['MISMATCH'],
-        stats['TIMEOUT'],
-        stats['UNKNOWN'],
-        stats['ERROR'],
-        f"{success_rate:.1f}%"
-    ])
-dir_headers = ["Directory", "Total", "Matches", "Mismatches", "Timeouts", "Unknowns", "Errors", "Success Rate"]
-print(tabulate(dir_table, headers=dir_headers, tablefmt="grid"))
-with open(report_filename, "a") as f:
-    f.write("\n\n===== Results by Directory =====\n")
-    f.write(tabulate(dir_table, headers=dir_headers, tablefmt="grid"))
+    ]
+
+def tally(records):
+    #match counts and cache hits/misses from journal-style records
+    counts = {'MATCH': 0, 'MISMATCH': 0, 'TIMEOUT': 0, 'MEMOUT': 0, 'UNKNOWN': 0, 'ERROR': 0}
+    cache_stats = {'hits': 0, 'misses': 0}
+    for record in records:
+        counts[record['row'][6]] += 1
+        if record.get('cached') is not None:
+            cache_stats['hits' if record['cached'] else 'misses'] += 1
+    return counts, cache_stats
+
+def portfolio_lines(records):
+    #per-tool win counts and reclaimed time for portfolio runs, empty when no record came from one
+    raced = [record for record in records if 'winner' in record]
+    if not raced:
+        return []
+    wins = {}
+    for record in raced:
+        name = record['winner'] or 'no verdict'
+        wins[name] = wins.get(name, 0) + 1
+    time_saved = sum(record.get('time_saved', 0) for record in raced)
+    return [
+        "Portfolio wins: " + ", ".join(f"{name}: {count}" for name, count in sorted(wins.items())),
+        f"Portfolio time reclaimed from killed runs: {time_saved:.2f}s (upper bound)"
+    ]
+
+def unwind_lines(records):
+    #how deep the CBMC deepening runs got and how the solver time splits across unwind bounds
+    depths = {}
+    time_per_bound = {}
+    for record in records:
+        rounds = record.get('rounds')
+        if not rounds:
+            continue
+        depth = rounds[-1]['unwind']
+        depths[depth] = depths.get(depth, 0) + 1
+        for r in rounds:
+            time_per_bound[r['unwind']] = time_per_bound.get(r['unwind'], 0) + r['time']
+    if not depths:
+        return []
+    return [
+        "Unwind depth reached: " + ", ".join(f"{depth}: {count}" for depth, count in sorted(depths.items())),
+        "CBMC time per unwind bound: " + ", ".join(f"{bound}: {t:.2f}s" for bound, t in sorted(time_per_bound.items()))
+    ]
+
+def property_rows(records):
+    #one row per checked property of every CBMC-verified benchmark: benchmark, property, expected, verdict, match
+    rows = []
+    for record in records:
+        for p in record.get('property_results') or []:
+            if p['verdict'] == 'SKIPPED':
+                continue
+            rows.append([record['row'][0], os.path.basename(p['property']), p['expected'], p['verdict'],
+                         match_label(p['match'])])
+    return rows
+
+def property_lines(records):
+    #how many CBMC runs the per-property jobs took after merging identical flag sets, and accuracy per property
+    planned = [record for record in records if record.get('property_results')]
+    if not planned:
+        return []
+    properties = sum(sum(p['verdict'] != 'SKIPPED' for p in record['property_results']) for record in planned)
+    jobs = sum(record['jobs'] for record in planned)
+    accuracy = {}
+    for row in property_rows(planned):
+        name = row[1].replace('.prp', '')
+        matched, total = accuracy.get(name, (0, 0))
+        accuracy[name] = (matched + (row[4] == "MATCH"), total + 1)
+    return [
+        f"CBMC runs: {jobs} for {properties} properties ({properties - jobs} shared)",
+        "Per-property matches: " + ", ".join(f"{name}: {matched}/{total}"
+                                             for name, (matched, total) in sorted(accuracy.items()))
+    ]
+
+def solver_rows(records):
+    #CBMC's own statistics per benchmark, most solver time first, to see which benchmarks are expensive and why
+    measured = sorted((record for record in records if record.get('cbmc_stats')),
+                      key=lambda record: record['cbmc_stats']['sat_time'], reverse=True)
+    rows = []
+    for record in measured:
+        stats = record['cbmc_stats']
+        rows.append([record['row'][0], stats['variables'], stats['clauses'], f"{stats['sat_time']:.3f}s",
+                     stats['checks'], stats['failed_check'] or "", stats['trace_length'] or ""])
+    return rows
+
+def prediction_rows(records):
+    #predicted against measured time per benchmark, worst prediction first
+    rows = []
+    for record in records:
+        if record.get('predicted') and record.get('actual'):
+            ratio = record['actual'] / record['predicted']
+            rows.append((max(ratio, 1 / ratio) if ratio > 0 else 0.0, [record['row'][0], f"{record['predicted']:.2f}s",
+                                                                       f"{record['actual']:.2f}s", f"{ratio:.2f}x",
+                                                                       record['row'][6]]))
+    return [row for _, row in sorted(rows, key=lambda x: x[0], reverse=True)]
+
+def prediction_lines(records):
+    stats = prediction_stats([(record.get('predicted'), record.get('actual')) for record in records])
+    if stats is None:
+        return []
+    count, error, within, correlation = stats
+    line = f"Runtime predictions: {count} benchmarks, median error {error:.2f}x, {within:.0%} within 2x"
+    if correlation is not None:
+        line += f", rank correlation {correlation:.2f}"
+    return [line]
+
+def pass_rows(records):
+    #which pass of a --passes sweep settled each benchmark, the latest pass first
+    rows = [[record['row'][0], record['pass'], f"{record['pass_timeout']:g}s", record['row'][5], record['row'][6]]
+            for record in records if record.get('pass')]
+    return sorted(rows, key=lambda x: (-x[1], x[0]))
 
+def pass_lines(records):
+    passes = {}
+    for record in records:
+        if record.get('pass'):
+            key = (record['pass'], record['pass_timeout'])
+            resolved, total = passes.get(key, (0, 0))
+            passes[key] = (resolved + (record['row'][6] not in retried_labels), total + 1)
+    if not passes:
+        return []
+    unresolved = sum(total - resolved for resolved, total in passes.values())
+    return ["Resolved by pass: " + ", ".join(f"{number} ({timeout:g}s): {resolved}"
+                                             for (number, timeout), (resolved, _) in sorted(passes.items()))
+            + f", still unresolved: {unresolved}"]
+
+def resource_rows(records):
+    #CPU time and peak memory of the verifier processes per benchmark, the most memory first
+    measured = sorted((record for record in records if (record.get('phases') or {}).get('peak_rss_kb')),
+                      key=lambda record: record['phases']['peak_rss_kb'], reverse=True)
+    return [[record['row'][0], f"{record['phases'].get('solver_cpu', 0.0):.2f}s",
+             f"{record['phases']['peak_rss_kb'] / 1024:.1f} MB", record['row'][6]] for record in measured]
+
+def witness_lines(records):
+    kept = [record['witness'] for record in records if record.get('witness')]
+    if not kept:
+        return []
+    return [f"CPAchecker output kept for {len(kept)} counterexamples and mismatches in {witness_dir}"]
+
+def report_sections(records):
+    return [
+        ("Results by Property", ["Benchmark", "Property", "Expected Verdict", "CBMC Verdict", "Match Status"],
+         sorted(property_rows(records), key=lambda x: (x[0], x[1]))),
+        ("CBMC Solver Statistics", ["Benchmark", "Variables", "Clauses", "SAT Time", "Checks", "Failed Check",
+                                    "Trace Length"], solver_rows(records)),
+        ("Predicted vs Actual Time", ["Benchmark", "Predicted", "Actual", "Actual/Predicted", "Match Status"],
+         prediction_rows(records)),
+        ("Verifier Resource Usage", ["Benchmark", "CPU Time", "Peak Memory", "Match Status"], resource_rows(records)),
+        ("Resolution by Pass", ["Benchmark", "Pass", "Timeout", "Time", "Match Status"], pass_rows(records))
+    ]
+
+def extra_lines(records):
+    #the summary lines after the match counts, each helper returns nothing when its feature wasn't used
+    return portfolio_lines(records) + unwind_lines(records) + property_lines(records) + phase_lines(records) + \
+        prediction_lines(records) + pass_lines(records) + witness_lines(records)
+
+def main():
+    args = parse_args()
+    if args.report_from_journal or args.merge:
+        #rebuild the text/CSV reports without running any verifier
+        paths = args.merge or [args.report_from_journal]
+        records, verdict_column = merge_records(paths)
+        if not records:
+            print(f"No finished benchmarks in {', '.join(paths)}")
+            exit(1)
+        counts, cache_stats = tally(records)
+        write_reports([record['row'] for record in records], counts, None,
+                      cache_stats if cache_stats['hits'] + cache_stats['misses'] else None,
+                      extra_lines(records) + shard_lines(records), verdict_column, report_sections(records))
+        return
+    if cgroup_parent() is not None:
+        #set up before the workers fork, so they all create their cgroups next to each other
+        print(f"Verifier processes run in their own cgroups under {cgroup_parent()}")
+    if args.passes and args.portfolio:
+        print("--passes doesn't apply to portfolio runs, every entrant already has its own timeout")
+        exit(1)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    limits = {'cpu': args.cpu_limit, 'mem': args.mem_limit}
+    tool = 'portfolio' if args.portfolio else args.tool
+    yml_files = get_yml_files(benchmark_dirs)
+    if not yml_files:
+        print("No benchmark YAML files found in the specified directories.")
+        exit(1)
+    if args.shard:
+        all_files = len(yml_files)
+        yml_files = select_shard(yml_files, args.shard, observed_runtimes(model_tool(tool, args)))
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(yml_files)} of {all_files} benchmarks")
+    for i, yml_file in enumerate(yml_files[:5]):
+        debug_yml_file(yml_file)
+        if i >= 4: 
+            print(f"\n({len(yml_files) - 5} more files not shown)")
+            break
+    records = []
+    if args.resume:
+        journal_path = args.resume
+        finished = latest_by_key(read_journal(journal_path))
+        records = [finished[key] for key in finished]
+        pending = [yml_path for yml_path in yml_files if os.path.normpath(yml_path) not in finished]
+        print(f"\nResuming from {journal_path}: {len(yml_files) - len(pending)} benchmarks already done")
+    else:
+        journal_path = (f"verification_journal_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+                        f"{shard_suffix(args.shard)}.jsonl")
+        pending = yml_files
+    if args.tool == 'cpachecker' or args.portfolio:
+        #resolved here, before the workers fork, so every benchmark reuses the same launcher and version string
+        cpachecker_path, cpa_launcher = find_cpachecker()
+        if cpachecker_path is not None:
+            print(f"Using CPAchecker at {cpa_launcher} ({tool_version(cpa_launcher, '-version')})")
+    pending, predicted, timeouts = plan_sweep(pending, args, tool, workers)
+    print(f"\nVerifying {len(pending)} benchmarks with {workers} worker(s), journal: {journal_path}\n")
+    sweep_start = time.time()
+    options = {
+        'limits': limits,
+        'cache': not args.no_cache,
+        'tool': args.tool,
+        'deepening': args.unwind_deepening,
+        'portfolio': args.portfolio_configs if args.portfolio else None,
+        'timeouts': timeouts
+    }
+    #without --passes there is one pass with the normal timeouts, with them every pass after the first
+    #re-runs only what is still unresolved, with the next larger timeout
+    passes = args.passes or [None]
+    final = latest_by_key(records)
+    with open_journal(journal_path) as journal, open_history() as history:
+        for number, pass_timeout in enumerate(passes, start=1):
+            if number > 1:
+                pending = [yml_path for yml_path in pending
+                           if final[os.path.normpath(yml_path)]['row'][6] in retried_labels]
+                pending = pass_fit(pending, pass_timeout, workers, args.max_wall, time.time() - sweep_start)
+                if not pending:
+                    break
+                print(f"\nPass {number}: re-running {len(pending)} unresolved benchmarks "
+                      f"with a {pass_timeout:g}s timeout")
+            if pass_timeout is not None:
+                timeouts = {yml_path: pass_timeout for yml_path in pending}
+                options['timeouts'] = timeouts
+            for done, (yml_path, result) in enumerate(verify_all(pending, workers, options), start=1):
+                record = result_record(yml_path, result, args, tool, predicted)
+                match_str = record['row'][6]
+                if args.passes:
+                    record['pass'] = number
+                    record['pass_timeout'] = pass_timeout
+                #cached results took no time, and a timeout shortened by the cost model or a screening pass says
+                #little about the runtime
+                cut_short = match_str == "TIMEOUT" and yml_path in timeouts
+                if not result.get('cached') and match_str not in ("ERROR", "MEMOUT") and not cut_short \
+                        and result_verdict(result) != 'CANCELLED':
+                    record_run(history, yml_path, model_tool(tool, args), benchmark_features(yml_path), result['time'],
+                               match_str == "TIMEOUT")
+                #written before anything else so a crash right after still keeps this benchmark
+                journal_append(journal, record)
+                final[record['yml_path']] = record
+                progress = f"{len(final)}/{len(yml_files)}" if number == 1 else f"pass {number}, {done}/{len(pending)}"
+                print(f"[{progress}] {record['row'][0]}: {match_str} ({result['time']:.2f}s)")
+    records = list(final.values())
+    wall_time = time.time() - sweep_start
+    if not args.no_cache:
+        prune_cache()
+    counts, cache_stats = tally(records)
+    write_reports([record['row'] for record in records], counts, wall_time, cache_stats if not args.no_cache else None,
+                  extra_lines(records), verdict_header(tool), report_sections(records), shard_suffix(args.shard))
+
+def result_record(yml_path, result, args, tool, predicted):
+    #the journal record of one finished benchmark
+    base_name = os.path.basename(yml_path).replace('.yml', '')
+    match_str = match_label(result['match'])
+    row = result_row(base_name, result, match_str)
+    if match_str == "MISMATCH":
+        print(f"\n Mismatch for: {base_name}")
+        print(f" Expected: {row[3]}")
+        print(f" {tool} said: {result_verdict(result)}")
+    #errors are never cached, so they don't count as hits or misses
+    cached = None if args.no_cache or match_str == "ERROR" else bool(result.get('cached'))
+    record = {
+        'yml_path': os.path.normpath(yml_path),
+        'row': row,
+        'cached': cached,
+        'tool': tool,
+        'finished': datetime.now().isoformat()
+    }
+    if args.shard:
+        record['shard'] = f"{args.shard[0]}/{args.shard[1]}"
+    if result.get('rounds'):
+        record['rounds'] = result['rounds']
+    if result.get('phases'):
+        record['phases'] = result['phases']
+    if result.get('cbmc_stats'):
+        record['cbmc_stats'] = result['cbmc_stats']
+    if result.get('property_results'):
+        record['property_results'] = result['property_results']
+        record['jobs'] = result['jobs']
+    if args.portfolio:
+        record['winner'] = result['winner']
+        record['time_saved'] = result['time_saved']
+    if result.get('witness'):
+        record['witness'] = result['witness']
+    if predicted.get(yml_path) is not None:
+        record['predicted'] = predicted[yml_path]
+        record['actual'] = result['time']
+    return record
+
+def pass_fit(pending, timeout, workers, max_wall, elapsed):
+    #the benchmarks of a later pass that fit in what is left of max_wall even if every one of them times out
+    #a benchmark's property jobs share its one timeout, so a timed out benchmark costs the timeout plus the
+    #time it takes to kill its process tree, not the timeout once per job
+    if max_wall is None:
+        return pending
+    fit = int(max(0.0, max_wall - elapsed) / (timeout + kill_slack) * workers)
+    if fit < len(pending):
+        print(f"\n{max_wall:g}s wall-clock cap: {len(pending) - fit} unresolved benchmarks are not retried")
+    return pending[:fit]
+
+def model_tool(tool, args):
+    #runtimes with and without unwind deepening are too different to share one model
+    return f"{tool}-deepening" if args.unwind_deepening else tool
+
+def plan_sweep(yml_files, args, tool, workers):
+    #returns (ordered benchmarks, predicted seconds per benchmark, adaptive timeouts per benchmark)
+    #without enough history for the tool the order falls back to the source size guess and nothing is left out
+    models = fit_models()
+    name = model_tool(tool, args)
+    if name not in models:
+        if args.schedule == 'budget' or args.adaptive_timeouts:
+            print(f"Not enough runtime history for {name} yet, scheduling by source size with the default timeouts")
+        return sorted(yml_files, key=expected_cost, reverse=args.schedule != 'shortest'), {}, {}
+    predicted = {yml_path: predict(models, name, benchmark_features(yml_path)) for yml_path in yml_files}
+    print(f"Runtime model for {name}: {models[name]['samples']} earlier runs, "
+          f"predicted total {sum(predicted.values()):.1f}s")
+    ordered, left_out = schedule_jobs(yml_files, predicted, args.schedule, args.time_budget, workers)
+    if left_out:
+        print(f"{len(left_out)} benchmarks don't fit in the {args.time_budget:g}s budget and are left for --resume: "
+              + ", ".join(os.path.basename(yml_path).replace('.yml', '') for yml_path in left_out[:10])
+              + (" ..." if len(left_out) > 10 else ""))
+    timeouts = {}
+    if args.adaptive_timeouts and not args.portfolio:
+        default = cbmc_timeout if tool == 'cbmc' else cpachecker_timeout
+        for yml_path in ordered:
+            timeout = job_timeout(models, name, predicted[yml_path], default)
+            if timeout < default:
+                timeouts[yml_path] = timeout
+        print(f"Adaptive timeouts below the default {default}s for {len(timeouts)} benchmarks")
+    return ordered, predicted, timeouts
+
+def csv_records(path):
+    #journal-style records from a report CSV, only the rows, as the CSV has nothing else
+    with open(path, 'r') as f:
+        lines = [line.rstrip('\n') for line in f if line.strip()]
+    if not lines:
+        return [], None
+    headers = lines[0].split(',')
+    #the rows are read by position, so a CSV with other columns (NN.py's or NN+CBMC.py's) would be miscounted
+    if len(headers) != len(report_columns) or any(header != column for header, column
+                                                  in zip(headers, report_columns) if column is not None):
+        print(f"{path} is not a CBMC.py report CSV, its columns are {', '.join(headers)}")
+        exit(1)
+    return [{'row': line.split(','), 'cached': None} for line in lines[1:]], headers[4]
+
+def merge_records(paths):
+    #(records, verdict column) from the journals and CSVs of one or more shards
+    #a benchmark in several journals (a shard that was re-run) keeps its latest record
+    journal_records = []
+    csv_rows = {}
+    verdict_column = None
+    for path in paths:
+        if path.endswith('.csv'):
+            records, column = csv_records(path)
+            verdict_column = verdict_column or column
+            for record in records:
+                csv_rows[(record['row'][1], record['row'][0])] = record
+        else:
+            journal_records.extend(read_journal(path))
+    records = list(latest_by_key(journal_records).values())
+    #rows already in a journal aren't counted twice when its CSV is passed as well
+    in_journals = {(record['row'][1], record['row'][0]) for record in records}
+    records.extend(record for key, record in csv_rows.items() if key not in in_journals)
+    if records and verdict_column is None:
+        verdict_column = verdict_header(records[0].get('tool'))
+    return records, verdict_column
+
+def shard_lines(records):
+    #benchmarks and verifier time per shard, to see how evenly a sharded sweep was split
+    shards = {}
+    for record in records:
+        if record.get('shard'):
+            count, seconds = shards.get(record['shard'], (0, 0.0))
+            shards[record['shard']] = (count + 1, seconds + float(record['row'][5].rstrip('s')))
+    if not shards:
+        return []
+    return ["Shards: " + "; ".join(f"{shard}: {count} benchmarks, {seconds:.2f}s"
+                                   for shard, (count, seconds) in sorted(shards.items()))]
+
+#the report CSV's columns, None stands for the verdict column named after the tool
+report_columns = ["Benchmark", "Directory", "Properties", "Expected Verdict", None, "Time", "Match Status"]
+
+def verdict_header(tool):
+    if tool == 'cbmc':
+        return "CBMC Verdict"
+    if tool == 'portfolio':
+        return "Portfolio Verdict"
+    return "CPAChecker Verdict"
+
+def write_reports(results, counts, wall_time, cache_stats=None, extra_lines=(), verdict_column="CPAChecker Verdict",
+                  sections=(), suffix=""):
+    #sections are extra (title, headers, rows) tables appended to the text report, empty ones are left out
+    #suffix goes at the end of the report names, e.g. the shard
+    results.sort(key=lambda x: (
+        0 if "ERROR" in x[6] else (
+            1 if "MISMATCH" in x[6] else (
+                2 if "UNKNOWN" in x[6] else (
+                    3 if "TIMEOUT" in x[6] or "MEMOUT" in x[6] else 4
+                )
+            )
+        ), 
+        x[1], 
+        x[0] 
+    ))
+    summary = (f"{counts['MATCH']} matches, {counts['MISMATCH']} mismatches, {counts['TIMEOUT']} timeouts, "
+               f"{counts['MEMOUT']} memouts, {counts['UNKNOWN']} unknowns, {counts['ERROR']} errors")
+    #creating a table
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    report_filename = f"verification_report_{timestamp}{suffix}.txt"
+    headers = [verdict_column if column is None else column for column in report_columns]
+    table = tabulate(results, headers=headers, tablefmt="grid")
+    with open(report_filename, "w") as f:
+        f.write(f"CBMC Verification Report - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(table)
+        f.write(f"\n\nSummary: {summary}\n")
+        if wall_time is not None:
+            f.write(f"Wall-clock time: {wall_time:.2f}s\n")
+        if cache_stats is not None:
+            f.write(stats_line(cache_stats['hits'], cache_stats['misses']) + "\n")
+        for line in extra_lines:
+            f.write(line + "\n")
+    print(f"\nSummary")
+    print(summary)
+    if wall_time is not None:
+        print(f"Wall-clock time: {wall_time:.2f}s")
+    if cache_stats is not None:
+        print(stats_line(cache_stats['hits'], cache_stats['misses']))
+    for line in extra_lines:
+        print(line)
+    print(f"Report saved to {report_filename}")
+    #creating a csv
+    csv_filename = f"verification_report_{timestamp}{suffix}.csv"
+    with open(csv_filename, "w") as f:
+        f.write(",".join(headers) + "\n")
+        for row in results:
+            cleaned_row = [str(cell).replace(",", ";") for cell in row]
+            f.write(",".join(cleaned_row) + "\n")
+    print(f"CSV saved to {csv_filename}")
+    directory_stats = {}
+    for result in results:
+        directory = result[1]
+        status = result[6]
+        if directory not in directory_stats:
+            directory_stats[directory] = {
+                'MATCH': 0, 'MISMATCH': 0, 'TIMEOUT': 0, 'MEMOUT': 0, 'UNKNOWN': 0, 'ERROR': 0, 'total': 0
+            }
+        directory_stats[directory][status] += 1
+        directory_stats[directory]['total'] += 1
+    print("\nResults by Directory")
+    dir_table = []
+    for directory, stats in directory_stats.items():
+        success_rate = (stats['MATCH'] / stats['total'] * 100) if stats['total'] > 0 else 0
+        dir_table.append([
+            directory,
+            stats['total'],
+            stats['MATCH'],
+            stats['MISMATCH'],
+            stats['TIMEOUT'],
+            stats['MEMOUT'],
+            stats['UNKNOWN'],
+            stats['ERROR'],
+            f"{success_rate:.1f}%"
+        ])
+    dir_headers = ["Directory", "Total", "Matches", "Mismatches", "Timeouts", "Memouts", "Unknowns", "Errors",
+                   "Success Rate"]
+    print(tabulate(dir_table, headers=dir_headers, tablefmt="grid"))
+    with open(report_filename, "a") as f:
+        f.write("\n\n===== Results by Directory =====\n")
+        f.write(tabulate(dir_table, headers=dir_headers, tablefmt="grid"))
+        for title, section_headers, rows in sections:
+            if rows:
+                f.write(f"\n\n===== {title} =====\n")
+                f.write(tabulate(rows, headers=section_headers, tablefmt="grid"))
 
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,99 @@
 import os
-import yaml
 import time
 from datetime import datetime
 from tabulate import tabulate
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import subprocess
+from inference_service import connect_scorer
+from cascade import connect_cascade, tally_stage, cascade_lines
+from pipeline import score_stream, chunk_size, open_csv, csv_append, read_csv_rows, async_iter, async_run
+from result_cache import cache_key, cache_get, cache_put, file_bytes, tool_version, prune_cache, stats_line
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from unwinding import run_deepening, rounds_summary, start_unwind, unwind_factor, max_unwind
+from verifier_process import run_command
+from goto_cache import goto_binary
+from cbmc_output import JsonUiParser, json_flags, json_outcome, text_outcome, solver_stats, parse_json_ui
+from sharding import shard_entries, shard_suffix
+from benchmark_index import load_index, load_meta, normalize_verdict
+from profiling import timed, add_phases, add_usage, phase_lines
+from job_planner import plan_jobs, property_pattern, map_job_verdicts, overall_verdict, overall_match
+from triage import escalation_order, uncertainty, accuracy_curve, sample_curve, load_threshold
 
 base_path = 'sv-benchmarks/c/floats-esbmc-regression'
 model_name = "claudios/VulBERTa-MLP-Devign" #can change to other hugging face models
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
+batch_size = 32 #files per forward pass
+backend = 'pytorch' #pytorch, int8 (dynamic quantization) or onnx (ONNX Runtime), compare them with backends.py
+#score files longer than 512 tokens as overlapping windows instead of truncating them
+window_mode = False
+window_aggregate = 'max' #max, mean or attention
+max_windows = 16 #cap on windows per file to bound the latency on big inputs
+use_cache = True #reuse scores for sources already scored by the same model and settings
+shard = None #(i, N) to only score shard i of N of the benchmarks, e.g. one shard per machine
+#early-exit cascade, see cascade.py: cheaper models score every file first and only pass on the files in their
+#uncertainty band, which has to contain threshold, e.g. [('linear', (0.6, 0.95)), (model_name, None)] after
+#training with `python cascade.py`
+cascade_stages = None
+threshold = 0.8 #bug scores above this are predicted "false"
+use_calibrated_threshold = False #take the threshold from calibration.json written by calibrate.py
+if use_calibrated_threshold:
+    threshold = load_threshold(threshold)
+#files whose bug score lands in this band (or with confidence below min_confidence) are escalated to CBMC
+uncertainty_band = (0.6, 0.95)
+min_confidence = None
+cbmc_budget = None #CPU-seconds; when set, files go to CBMC most uncertain first until it is spent
+unwind_deepening = False #grow the CBMC unwind bound from a small start instead of a fixed --unwind 50
+cbmc_timeout = 30 #seconds of CBMC per escalated file, shared by its property jobs
+cbmc_json_output = True #run CBMC with --json-ui and keep a parsed summary instead of its whole output
+goto_binaries = True #compile each source once with goto-cc and start every CBMC run from the stored binary
+cbmc_concurrency = max(1, (os.cpu_count() or 1) // 2) #CBMC runs at once, the other cores are left to the model
+#the threads that wait on CBMC and goto-cc, kept apart from the default pool that pulls the NN chunks, so a
+#full set of CBMC runs can't take every worker thread and starve the scoring side
+cbmc_executor = ThreadPoolExecutor(max_workers=cbmc_concurrency, thread_name_prefix='cbmc')
+max_pending_escalations = 256 #escalations queued before the NN side is held back
+#verdicts that say more about the machine's load than the file, never cached and ignored when an older cache
+#has them, as in CBMC.py
+resource_verdicts = ('TIMEOUT', 'MEMOUT')
+#a running inference_service.py daemon is used when there is one, otherwise the model is loaded in this
+#process the first time a source actually needs scoring
+if cascade_stages:
+    scorer = connect_cascade(cascade_stages, threshold, backend, window_mode, window_aggregate, max_windows,
+                             batch_size)
+else:
+    scorer = connect_scorer(model_name, backend, window_mode, window_aggregate, max_windows, batch_size)
 
-def run_cbmc_verification(yml_path, base_dir):
+async def run_cbmc_verification(yml_path, base_dir):
     full_yml_path = yml_path
-    with open(full_yml_path, 'r') as f:
-        meta = yaml.safe_load(f)
+    phases = {}
+    with timed(phases, 'yaml_parse'):
+        meta = load_meta(full_yml_path)
     c_file = os.path.join(base_dir, meta['input_files'])
     properties = [
         p for p in meta.get('properties', [])
         if 'expected_verdict' in p
     ]
     cbmc_flags = ['--unwind', '50', '--no-standard-checks']
+    #the property jobs keep the unwinding assertions like CBMC.py, so a SUCCESS isn't only for the first 50
+    #iterations, coverage reports goals instead of a verdict and goes without them
     property_map = {
-        'no-overflow': ['--signed-overflow-check', '--unsigned-overflow-check', '--div-by-zero-check'],
+        'no-overflow': ['--unwinding-assertions', '--signed-overflow-check', '--unsigned-overflow-check',
+                        '--div-by-zero-check'],
         'unreach-call': ['--unwinding-assertions', '--bounds-check'],
-        'valid-deref': ['--pointer-check', '--bounds-check'],
-        'valid-free': ['--pointer-check', '--memory-leak-check'],
-        'valid-memtrack': ['--memory-leak-check', '--bounds-check'],
+        'valid-deref': ['--unwinding-assertions', '--pointer-check', '--bounds-check'],
+        'valid-free': ['--unwinding-assertions', '--pointer-check', '--memory-leak-check'],
+        'valid-memtrack': ['--unwinding-assertions', '--memory-leak-check', '--bounds-check'],
         'termination': ['--unwinding-assertions', '--bounds-check'],
-        'memory-safety': ['--pointer-check', '--memory-leak-check', '--bounds-check', '--div-by-zero-check'],
+        'memory-safety': ['--unwinding-assertions', '--pointer-check', '--memory-leak-check', '--bounds-check',
+                          '--div-by-zero-check'],
         'coverage': ['--cover-assertions']
     }
     found_properties = []
     for prop in properties:
         prop_file = prop['property_file']
-        found_property = False
-        for pattern, flags in property_map.items():
-            if pattern in prop_file:
-                found_property = True
-                found_properties.append(pattern)
-                for flag in flags:
-                    if flag not in cbmc_flags:
-                        cbmc_flags.append(flag)
-                break       
-        if not found_property:
+        pattern = property_pattern(prop_file, property_map)
+        if pattern is None:
             print(f"Unknown property: {prop_file}")
+        else:
+            found_properties.append(pattern)
     expected_verdicts = []
     for prop in properties:
         if 'expected_verdict' in prop:
@@ -53,145 +101,216 @@ def run_cbmc_verification(yml_path, base_dir):
                 'property': prop['property_file'],
                 'verdict': prop['expected_verdict']
             })
-    cmd = ['cbmc', c_file] + cbmc_flags
-    print(f"\nRunning: {' '.join(cmd)}")
-    start_time = time.time()
-    try:
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30)
-        output = result.stdout + '\n' + result.stderr
-        execution_time = time.time() - start_time
-    except subprocess.TimeoutExpired:
-        execution_time = time.time() - start_time
-        return {
-            'cbmc_verdict': 'TIMEOUT',
-            'expected_verdicts': expected_verdicts,
-            'properties': found_properties,
-            'time': execution_time,
-            'match': False,
-            'output': "CBMC timed out"
-        }
-    cbmc_success = "VERIFICATION SUCCESSFUL" in output
-    cbmc_failure = "VERIFICATION FAILED" in output
-    cbmc_verdict = None
-    if cbmc_success:
-        cbmc_verdict = "SUCCESS"
-    elif cbmc_failure:
-        cbmc_verdict = "FAILURE"
-    else:
-        cbmc_verdict = "UNKNOWN"
-    if len(expected_verdicts) == 0:
-        print("No expected verdicts specified, cannot compare.")
-        match = "UNKNOWN"
-    else:
-        expected_overall = all(v['verdict'] for v in expected_verdicts)
-        match = (cbmc_verdict == "SUCCESS") == expected_overall
+    #one CBMC job per distinct flag set, coverage gets its own --cover-assertions run like any other property
+    #and keeps the assertions it covers
+    jobs, assignment = plan_jobs(properties, cbmc_flags, property_map, unsupported=(),
+                                 assertion_properties=('unreach-call', 'coverage'))
+    #all jobs of the file share one cbmc_timeout, once it's spent the remaining properties time out unrun
+    deadline = time.time() + cbmc_timeout
+    job_results = []
+    for job in jobs:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            job_results.append({'verdict': 'TIMEOUT', 'time': 0.0, 'output': "CBMC not run, file timeout spent",
+                                'rounds': None, 'cached': False, 'phases': {}})
+            continue
+        job_results.append(await run_cbmc_job(c_file, job['flags'], remaining))
+    property_results = map_job_verdicts(properties, assignment, [r['verdict'] for r in job_results],
+                                        normalize_verdict)
+    rounds = [r for job_result in job_results for r in (job_result['rounds'] or [])]
+    for job_result in job_results:
+        add_phases(phases, job_result['phases'])
     return {
-        'cbmc_verdict': cbmc_verdict,
+        'cbmc_verdict': overall_verdict([p['verdict'] for p in property_results]),
         'expected_verdicts': expected_verdicts,
         'properties': found_properties,
-        'time': execution_time,
-        'match': match,
-        'output': output
+        'property_results': property_results,
+        'jobs': len(jobs),
+        'time': sum(r['time'] for r in job_results),
+        'match': overall_match(property_results),
+        'output': "\n".join(r['output'] for r in job_results),
+        'rounds': rounds or None,
+        'cached': bool(job_results) and all(r['cached'] for r in job_results),
+        'phases': phases,
+        'cbmc_stats': solver_stats([r.get('cbmc') for r in job_results])
     }
 
+async def run_cbmc_job(c_file, flags, timeout):
+    #one CBMC run with a fixed flag set, cached on the source and flags so identical runs are shared
+    #timeout isn't part of the key, timeouts aren't cached
+    #with cbmc_json_output the result has a compact 'cbmc' summary and output is its one-line text
+    if cbmc_json_output:
+        flags = flags + json_flags
+    cmd = ['cbmc', c_file] + flags
+    deepening_settings = [start_unwind, unwind_factor, max_unwind] if unwind_deepening else None
+    phases = {}
+    with timed(phases, 'file_read'):
+        source = file_bytes(c_file)
+    key = cache_key('cbmc-job', tool_version('cbmc'), flags, source, deepening_settings)
+    cached = cache_get(key) if use_cache else None
+    if cached is not None and cached['verdict'] in resource_verdicts:
+        cached = None
+    if cached is not None:
+        print(f"\nCache hit: {' '.join(cmd)}")
+        cached['cached'] = True
+        cached['phases'] = phases
+        return cached
+    outcome = json_outcome if cbmc_json_output else text_outcome
+    start_time = time.time()
+    async def attempt(program):
+        #(verdict, output, rounds, summary, status) of CBMC on program, the source or its goto-binary
+        #compiling the goto-binary counts against the job's timeout like the CBMC run itself
+        remaining = timeout - (time.time() - start_time)
+        if unwind_deepening:
+            def run(round_cmd, round_timeout):
+                #one deepening round, with the usage of its own process added to this job's phases
+                usage = {}
+                returncode, stdout, stderr, status = run_command(round_cmd, round_timeout, usage=usage)
+                add_usage(phases, usage)
+                return returncode, parse_json_ui(stdout) if cbmc_json_output else stdout, stderr, status
+            #the deepening rounds are plain blocking runs, so they go to a CBMC thread
+            verdict, output, rounds = await asyncio.get_running_loop().run_in_executor(
+                cbmc_executor, functools.partial(run_deepening, program, flags, remaining, run, outcome=outcome))
+            print(f"Unwind rounds: {rounds_summary(rounds)}")
+            status = verdict.lower() if verdict in ('TIMEOUT', 'MEMOUT') else 'done'
+            return verdict, output, rounds, None, status
+        cmd = ['cbmc', program] + flags
+        print(f"\nRunning: {' '.join(cmd)}")
+        usage = {}
+        parser = JsonUiParser() if cbmc_json_output else None
+        def feed(chunk):
+            with timed(phases, 'output_parse'):
+                parser.feed(chunk)
+        returncode, stdout, stderr, status = await async_run(cmd, remaining, usage, feed if parser else None,
+                                                             executor=cbmc_executor)
+        add_usage(phases, usage)
+        summary = None
+        if parser:
+            summary = stdout = parser.summary()
+        with timed(phases, 'output_parse'):
+            verdict, _, output = outcome(stdout, stderr)
+        if status == 'timeout':
+            verdict = 'TIMEOUT'
+            output = "CBMC timed out"
+        return verdict, output, None, summary, status
+    program = c_file
+    if goto_binaries:
+        with timed(phases, 'frontend'):
+            program = await asyncio.get_running_loop().run_in_executor(
+                cbmc_executor, goto_binary, c_file, flags, source) or c_file
+    verdict, output, rounds, summary, status = await attempt(program)
+    if (program != c_file and status == 'done' and verdict not in ('SUCCESS', 'FAILURE')
+            and not os.path.exists(program)):
+        #prune_cache evicted the binary before CBMC read it, that error says nothing about the source
+        print(f"goto-binary of {c_file} was evicted during the run, running CBMC on the source")
+        verdict, output, rounds, summary, status = await attempt(c_file)
+    job_result = {'verdict': verdict, 'time': time.time() - start_time, 'output': output, 'rounds': rounds,
+                  'cached': False, 'phases': phases, 'cbmc': summary}
+    #a timeout depends on how busy the machine was, like CBMC.py it is run again next time
+    if use_cache and verdict not in resource_verdicts:
+        cache_put(key, job_result)
+    return job_result
+
 def run_model(code):
-    inputs = tokenizer(
-        code,
-        padding='max_length',
-        truncation=True,
-        max_length=512,  #need to explicitly set this for simpler datasets
-        return_tensors="pt"
-    )
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
-        probabilities = torch.softmax(logits, dim=1)
-    vulnerability_score = probabilities[0][1].item()
-    confidence = max(probabilities[0]).item()
-    return {
-        'vulnerability_score': vulnerability_score,
-        'confidence': confidence
-    }
-def interpret_cbmc_result(cbmc_result, expected_verdict_str):
-    if cbmc_result['cbmc_verdict'] == 'SUCCESS':
+    return scorer.score(scorer.encode([code]))[0]
+def property_verdict(cbmc_result, property_file):
+    #the verdict of the CBMC job that checked this property, the file-level verdict for older cached results
+    for p in cbmc_result.get('property_results') or []:
+        if p['property'] == property_file:
+            return p['verdict']
+    return cbmc_result['cbmc_verdict']
+def interpret_cbmc_result(cbmc_verdict):
+    if cbmc_verdict == 'SUCCESS':
         return "true"  
-    elif cbmc_result['cbmc_verdict'] == 'FAILURE':
+    elif cbmc_verdict == 'FAILURE':
         return "false"  
     else:
         return "unknown" 
     
-c_files = [f for f in os.listdir(base_path) if f.endswith('.c')]
-file_pairs = []
-for c_file in c_files:
-    base_name = os.path.splitext(c_file)[0]
-    yml_file = base_name + '.yml'
-    yml_path = os.path.join(base_path, yml_file)
-    c_path = os.path.join(base_path, c_file)
-    if os.path.exists(yml_path):
-        with open(c_path, 'r') as f:
-            c_code = f.read()
-        with open(yml_path, 'r') as f:
-            yml_data = yaml.safe_load(f)
-        file_pairs.append({
-            'name': base_name,
-            'c_code': c_code,
-            'yml': yml_data,
-            'c_path': c_path,
-            'yml_path': yml_path
-        })
-results = []
 properties_analyzed = 0
 properties_with_no_verdict = 0
 nn_correct_predictions = 0
 cbmc_correct_predictions = 0
 combined_correct_predictions = 0
 cbmc_runs = 0
-for pair in file_pairs:
+cbmc_jobs = 0
+solver_totals = {'variables': 0, 'clauses': 0, 'sat_time': 0.0}
+phases = {}
+stage_stats = {}
+files_scored = 0
+files_left_to_nn = 0
+timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+report_filename = f"Optimized_Verification_{timestamp}{shard_suffix(shard)}.txt"
+csv_filename = f"Optimized_Verification_{timestamp}{shard_suffix(shard)}.csv"
+headers = ["Benchmark", "Property", "Expected", "NN Verdict", 
+           "Bug Score", "Model Confidence", "NN Time", 
+           "CBMC Result", "CBMC Verdict", "CBMC Time",
+           "Combined Verdict", "Combined Correct"]
+#sources are loaded, tokenized and scored in chunks by background stages, so the model works on the next
+#chunk while CBMC runs on this one and rows reach the CSV as each chunk is verified
+print(f"Scoring files in chunks of {chunk_size}, batches of up to {batch_size}...")
+stream = score_stream(shard_entries(load_index([base_path]), shard), scorer, use_cache)
+csv_file = open_csv(csv_filename, headers)
+cbmc_seconds = {}
+escalated = []
+cbmc_cpu_spent = 0.0
+escalated_properties = 0
+nn_correct_by_file = {}
+combined_correct_by_file = {}
+
+def emit_rows(pair, nn_result, cbmc_result):
+    #writes one file's rows to the CSV, called as soon as its verdicts are final
+    global properties_analyzed, properties_with_no_verdict, nn_correct_predictions, cbmc_correct_predictions
+    global combined_correct_predictions, escalated_properties
     base_name = pair['name']
+    add_phases(phases, pair['phases'])
+    tally_stage(stage_stats, nn_result)
+    if cbmc_result is not None:
+        add_phases(phases, cbmc_result['phases'])
     print(f"Analyzing {base_name}...")
-    yml_data = pair['yml']
-    properties = yml_data.get('properties', [])
+    if window_mode:
+        print(f"  {nn_result['windows']} window(s) scored in {nn_result['time']:.2f}s")
+    properties = pair['properties']
     if not properties:
         print(f"No properties in YML for {base_name}")
-        continue
-    start_time = time.time()
-    nn_result = run_model(pair['c_code'])
-    nn_execution_time = time.time() - start_time
+        return
+    nn_execution_time = nn_result['time']
+    predicted_verdict = "true" if nn_result['vulnerability_score'] <= threshold else "false"
+    nn_correct_by_file[base_name] = 0
+    combined_correct_by_file[base_name] = 0
     for prop in properties:
-        property_file = prop.get('property_file', 'unknown')
+        property_file = prop['property_file'] or 'unknown'
         property_name = os.path.basename(property_file)
-        expected_verdict = prop.get('expected_verdict')
+        expected_verdict = prop['verdict']
         if expected_verdict is None:
             print(f"⚠️ No expected verdict for property {property_name} in {base_name}")
             properties_with_no_verdict += 1
             continue
         properties_analyzed += 1    
-        threshold = 0.8 #setting threshold
-        predicted_verdict = "true" if nn_result['vulnerability_score'] <= threshold else "false"
         expected_verdict_str = "true" if expected_verdict else "false"
         nn_correct = predicted_verdict == expected_verdict_str
         if nn_correct:
             nn_correct_predictions += 1
-            combined_correct_predictions += 1 
+            nn_correct_by_file[base_name] += 1
+        if cbmc_result is None:
             cbmc_verdict = "NOT RUN"
             cbmc_predicted_verdict = "N/A"
-            cbmc_match = "N/A"
             cbmc_time = "N/A"
             combined_verdict = predicted_verdict
         else:
-            # Only run CBMC when NN prediction is wrong
-            cbmc_runs += 1
-            cbmc_result = run_cbmc_verification(pair['yml_path'], base_path)
-            cbmc_verdict = cbmc_result['cbmc_verdict']
-            cbmc_match = cbmc_result['match']
+            escalated_properties += 1
+            cbmc_verdict = property_verdict(cbmc_result, prop['property_file'])
+            if cbmc_result.get('rounds'):
+                cbmc_verdict = f"{cbmc_verdict} (unwind {cbmc_result['rounds'][-1]['unwind']})"
             cbmc_time = f"{cbmc_result['time']:.2f}s"
-            cbmc_predicted_verdict = interpret_cbmc_result(cbmc_result, expected_verdict_str)
-            cbmc_correct = cbmc_predicted_verdict == expected_verdict_str
-            if cbmc_correct:
+            cbmc_predicted_verdict = interpret_cbmc_result(property_verdict(cbmc_result, prop['property_file']))
+            if cbmc_predicted_verdict == expected_verdict_str:
                 cbmc_correct_predictions += 1
-                combined_correct_predictions += 1 
             combined_verdict = cbmc_predicted_verdict if cbmc_predicted_verdict != "unknown" else predicted_verdict
-        results.append([
+        if combined_verdict == expected_verdict_str:
+            combined_correct_predictions += 1
+            combined_correct_by_file[base_name] += 1
+        csv_append(csv_file, [
             base_name,
             property_name,
             expected_verdict_str,
@@ -205,44 +324,116 @@ for pair in file_pairs:
             combined_verdict,
             "✓" if combined_verdict == expected_verdict_str else "✗"
         ])
-#create a table
+
+async def escalate(pair, nn_result, cbmc_slots):
+    global cbmc_cpu_spent, cbmc_runs, cbmc_jobs, files_left_to_nn
+    async with cbmc_slots:
+        #runs already started when the budget runs out still finish, so it can be overshot by up to
+        #cbmc_concurrency - 1 runs
+        if cbmc_budget is not None and cbmc_cpu_spent >= cbmc_budget:
+            files_left_to_nn += 1
+            emit_rows(pair, nn_result, None)
+            return
+        print(f"Escalating {pair['name']} to CBMC (bug score {nn_result['vulnerability_score']:.4f})")
+        cbmc_result = await run_cbmc_verification(pair['yml_path'], base_path)
+        #the CPU time of this file's own CBMC processes, each reaped with wait4, nothing for cached jobs
+        cpu_seconds = cbmc_result['phases'].get('solver_cpu', 0.0)
+        cbmc_seconds[pair['name']] = cpu_seconds
+        cbmc_cpu_spent += cpu_seconds
+        escalated.append((uncertainty(nn_result, threshold), pair['name']))
+        cbmc_runs += 1
+        cbmc_jobs += cbmc_result['jobs']
+        for name in solver_totals:
+            solver_totals[name] += (cbmc_result['cbmc_stats'] or {}).get(name, 0)
+    emit_rows(pair, nn_result, cbmc_result)
+
+async def verify_stream(stream):
+    #the NN stages keep scoring on their threads while up to cbmc_concurrency CBMC runs go on here,
+    #so the wall time tends towards the slower of the two instead of their sum
+    global files_scored
+    cbmc_slots = asyncio.Semaphore(cbmc_concurrency)
+    pending = set()
+    async for chunk in async_iter(stream):
+        #decide which files of this chunk go to CBMC from the NN output alone, most uncertain first
+        #with a budget the order is per chunk, files of later chunks get whatever budget is left
+        scored = [(pair, nn_result) for pair, nn_result in chunk if pair['properties']]
+        files_scored += len(scored)
+        order = escalation_order([nn_result for _, nn_result in scored], threshold, uncertainty_band,
+                                 min_confidence, cbmc_budget)
+        chosen = {scored[i][0]['name'] for i in order}
+        #the semaphore wakes waiters in order, so the most uncertain files start first
+        for i in order:
+            pending.add(asyncio.create_task(escalate(*scored[i], cbmc_slots)))
+        for pair, nn_result in chunk:
+            if pair['name'] not in chosen:
+                emit_rows(pair, nn_result, None)
+        for task in [task for task in pending if task.done()]:
+            pending.discard(task)
+            task.result()
+        #stop pulling chunks while too many escalations are queued, the NN side then waits on its queues
+        while len(pending) > max_pending_escalations:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+    if pending:
+        await asyncio.gather(*pending)
+
+asyncio.run(verify_stream(stream))
+cbmc_executor.shutdown()
+csv_file.close()
+if cbmc_budget is not None and files_left_to_nn:
+    print(f"CBMC budget of {cbmc_budget:.0f} CPU-seconds spent, {files_left_to_nn} files left to the NN")
+if use_cache:
+    prune_cache()
+#create a table, sorted from the rows already written to the CSV
+results = read_csv_rows(csv_filename)
 results.sort(key=lambda x: (x[0], x[1]))
-timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-report_filename = f"Optimized_Verification_{timestamp}.txt"
-headers = ["Benchmark", "Property", "Expected", "NN Verdict", 
-           "Bug Score", "Model Confidence", "NN Time", 
-           "CBMC Result", "CBMC Verdict", "CBMC Time",
-           "Combined Verdict", "Combined Correct"]
 table = tabulate(results, headers=headers, tablefmt="grid")
 nn_accuracy = nn_correct_predictions / properties_analyzed if properties_analyzed else 0.0
-cbmc_correction_rate = cbmc_correct_predictions / cbmc_runs if cbmc_runs else 0.0
+cbmc_correction_rate = cbmc_correct_predictions / escalated_properties if escalated_properties else 0.0
 combined_accuracy = combined_correct_predictions / properties_analyzed if properties_analyzed else 0.0
 improvement = combined_accuracy - nn_accuracy
-cbmc_savings = properties_analyzed - cbmc_runs
+cbmc_savings = files_scored - cbmc_runs
+savings_rate = cbmc_savings / files_scored if files_scored else 0.0
+#accuracy against CBMC CPU-seconds if escalation had stopped after each file, to pick the operating point
+#in escalation order, most uncertain first, not in the order the concurrent runs happened to finish
+escalation_ranking = [name for _, name in sorted(escalated)]
+curve = accuracy_curve(escalation_ranking, nn_correct_by_file, combined_correct_by_file, cbmc_seconds, properties_analyzed)
+curve_headers = ["Escalations", "CBMC CPU Seconds", "Combined Accuracy"]
+curve_table = tabulate([[k, f"{spent:.2f}", f"{acc:.2%}"] for k, spent, acc in sample_curve(curve)],
+                       headers=curve_headers, tablefmt="grid")
+if cbmc_budget is not None:
+    policy = f"most uncertain first within {cbmc_budget:.0f} CPU-seconds"
+else:
+    policy = f"bug score in {uncertainty_band}" + (f" or confidence below {min_confidence}" if min_confidence is not None else "")
+summary_lines = [
+    f"Properties analyzed: {properties_analyzed}",
+    f"Properties without verdict: {properties_with_no_verdict}",
+    f"Neural Network accuracy: {nn_accuracy:.2%}",
+    f"CBMC runs: {cbmc_runs} (escalated when {policy})",
+    f"CBMC solver jobs: {cbmc_jobs} for {escalated_properties} escalated properties",
+    f"CBMC CPU time: {cbmc_cpu_spent:.2f}s",
+    f"CBMC solver: {solver_totals['variables']} variables, {solver_totals['clauses']} clauses, "
+    f"{solver_totals['sat_time']:.2f}s SAT time",
+    f"CBMC accuracy: {cbmc_correction_rate:.2%} of escalated properties",
+    f"Combined accuracy: {combined_accuracy:.2%}",
+    f"Improvement over NN: {improvement:.2%}",
+    f"Computation saved: {cbmc_savings} CBMC runs avoided ({savings_rate:.2%} of files)",
+]
+if use_cache:
+    summary_lines.append(stats_line())
+summary_lines.extend(phase_lines([{'phases': phases}]))
+summary_lines.extend(cascade_lines(stage_stats))
 with open(report_filename, "w") as f:
     f.write(f"Optimized Verification Analysis Report - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
     f.write(table)
     f.write(f"\n\nSummary:\n")
-    f.write(f"Properties analyzed: {properties_analyzed}\n")
-    f.write(f"Properties without verdict: {properties_with_no_verdict}\n")
-    f.write(f"Neural Network accuracy: {nn_accuracy:.2%}\n")
-    f.write(f"CBMC runs: {cbmc_runs} (only when NN was wrong)\n")
-    f.write(f"CBMC correction rate: {cbmc_correction_rate:.2%} of wrong NN predictions\n")
-    f.write(f"Combined accuracy: {combined_accuracy:.2%}\n")
-    f.write(f"Improvement over NN: {improvement:.2%}\n")
-    f.write(f"Computation saved: {cbmc_savings} CBMC runs avoided ({cbmc_savings/properties_analyzed:.2%} of total)\n")
+    for line in summary_lines:
+        f.write(line + "\n")
+    f.write("\n===== Accuracy vs CBMC time =====\n")
+    f.write(curve_table + "\n")
 print(f"\nSummary:")
-print(f"Properties analyzed: {properties_analyzed}")
-print(f"Properties without verdict: {properties_with_no_verdict}")
-print(f"Neural Network accuracy: {nn_accuracy:.2%}")
-print(f"CBMC runs: {cbmc_runs} (only when NN was wrong)")
-print(f"CBMC correction rate: {cbmc_correction_rate:.2%} of wrong NN predictions")
-print(f"Combined accuracy: {combined_accuracy:.2%}")
-print(f"Improvement over NN: {improvement:.2%}")
-print(f"Computation saved: {cbmc_savings} CBMC runs avoided ({cbmc_savings/properties_analyzed:.2%} of total)")
-csv_filename = f"Optimized_Verification_{timestamp}.csv"
-with open(csv_filename, "w") as f:
-    f.write(",".join(headers) + "\n")
-    for row in results:
-        cleaned_row = [str(cell).replace(",", ";") for cell in row]
-        f.write(",".join(cleaned_row) + "\n")
\ No newline at end of file
+for line in summary_lines:
+    print(line)
+print("\nAccuracy vs CBMC time")
+print(curve_table)
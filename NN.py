@@ -1,15 +1,40 @@
 import os
-import yaml
-import time
 from datetime import datetime
 from tabulate import tabulate
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from inference_service import connect_scorer
+from cascade import connect_cascade, tally_stage, cascade_lines
+from pipeline import score_stream, chunk_size, open_csv, csv_append, read_csv_rows
+from sharding import shard_entries, shard_suffix
+from benchmark_index import load_index
+from triage import load_threshold
+from result_cache import prune_cache, stats_line
+from profiling import add_phases, phase_lines
 
 base_path = 'sv-benchmarks/c/floats-esbmc-regression'
 model_name = "claudios/VulBERTa-MLP-Devign" #can change this to other hugging face models
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
+batch_size = 32 #files per forward pass
+backend = 'pytorch' #pytorch, int8 (dynamic quantization) or onnx (ONNX Runtime), compare them with backends.py
+#score files longer than 512 tokens as overlapping windows instead of truncating them
+window_mode = False
+window_aggregate = 'max' #max, mean or attention
+max_windows = 16 #cap on windows per file to bound the latency on big inputs
+use_cache = True #reuse scores for sources already scored by the same model and settings
+shard = None #(i, N) to only score shard i of N of the benchmarks, e.g. one shard per machine
+#early-exit cascade, see cascade.py: cheaper models score every file first and only pass on the files in their
+#uncertainty band, which has to contain threshold, e.g. [('linear', (0.6, 0.95)), (model_name, None)] after
+#training with `python cascade.py`
+cascade_stages = None
+threshold = 0.85 #bug scores above this are predicted "false"
+use_calibrated_threshold = False #take the threshold from calibration.json written by calibrate.py
+if use_calibrated_threshold:
+    threshold = load_threshold(threshold)
+#a running inference_service.py daemon is used when there is one, otherwise the model is loaded in this
+#process the first time a source actually needs scoring
+if cascade_stages:
+    scorer = connect_cascade(cascade_stages, threshold, backend, window_mode, window_aggregate, max_windows,
+                             batch_size)
+else:
+    scorer = connect_scorer(model_name, backend, window_mode, window_aggregate, max_windows, batch_size)
 def compute_baseline_stats(expected_verdicts):
     if not expected_verdicts:
         return {}
@@ -29,97 +54,73 @@ def compute_baseline_stats(expected_verdicts):
         'best_baseline': max(always_true_acc, always_false_acc, random_acc)
     }
 def run_model(code):
-    inputs = tokenizer(
-        code,
-        padding='max_length',
-        truncation=True,
-        max_length=512,  # explicitly set limit
-        return_tensors="pt"
-    )
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
-        probabilities = torch.softmax(logits, dim=1)
-    vulnerability_score = probabilities[0][1].item()
-    confidence = max(probabilities[0]).item()
-    return {
-        'vulnerability_score': vulnerability_score,
-        'confidence': confidence
-    }
-
+    return scorer.score(scorer.encode([code]))[0]
 
-c_files = [f for f in os.listdir(base_path) if f.endswith('.c')]
-file_pairs = []
-#this is essentially just matching teh c code with yml files
-for c_file in c_files:
-    base_name = os.path.splitext(c_file)[0]
-    yml_file = base_name + '.yml'
-    yml_path = os.path.join(base_path, yml_file)
-    c_path = os.path.join(base_path, c_file)
-    if os.path.exists(yml_path):
-        with open(c_path, 'r') as f:
-            c_code = f.read()
-        with open(yml_path, 'r') as f:
-            yml_data = yaml.safe_load(f)
-        file_pairs.append({
-            'name': base_name,
-            'c_code': c_code,
-            'yml': yml_data,
-            'c_path': c_path,
-            'yml_path': yml_path
-        })
 
-results = []
 properties_analyzed = 0
 #i.e. sometimes the yml file just has unreach: ...
 properties_with_no_verdict = 0
 correct_predictions = 0
+files_scored = 0
+phases = {}
+stage_stats = {}
 all_expected_verdicts = []
-for pair in file_pairs:
-    base_name = pair['name']
-    print(f"Analyzing {base_name}...")
-    yml_data = pair['yml']
-    properties = yml_data.get('properties', [])
-    if not properties:
-        print(f"No properties in YML for {base_name}")
-        continue
-    start_time = time.time()
-    nn_result = run_model(pair['c_code'])
-    threshold = 0.80
-    predicted_verdict = "true" if nn_result['vulnerability_score'] <= threshold else "false"
-    execution_time = time.time() - start_time
-    for prop in properties:
-        property_file = prop.get('property_file', 'unknown')
-        property_name = os.path.basename(property_file)
-        expected_verdict = prop.get('expected_verdict')
-        if expected_verdict is None:
-            print(f"No expected verdict for property {property_name} in {base_name}")
-            properties_with_no_verdict += 1
+timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+report_filename = f"NN_bugs{timestamp}{shard_suffix(shard)}.txt"
+csv_filename = f"NN_bugs{timestamp}{shard_suffix(shard)}.csv"
+headers = ["Benchmark", "Property", "Expected Verdict", "Predicted Verdict", 
+           "Bug Confidence Score", "Model Confidence", "Analysis Time"]
+#sources are loaded, tokenized and scored in chunks by background stages, rows go to the CSV as soon as a
+#chunk is scored instead of after the whole directory
+print(f"Scoring files in chunks of {chunk_size}, batches of up to {batch_size}...")
+stream = score_stream(shard_entries(load_index([base_path]), shard), scorer, use_cache)
+csv_file = open_csv(csv_filename, headers)
+for chunk in stream:
+    for pair, nn_result in chunk:
+        files_scored += 1
+        add_phases(phases, pair['phases'])
+        tally_stage(stage_stats, nn_result)
+        base_name = pair['name']
+        print(f"Analyzing {base_name}...")
+        if window_mode:
+            print(f"  {nn_result['windows']} window(s) scored in {nn_result['time']:.2f}s")
+        properties = pair['properties']
+        if not properties:
+            print(f"No properties in YML for {base_name}")
             continue
-        properties_analyzed += 1    
-        all_expected_verdicts.append(expected_verdict)
-        threshold = 0.85
         predicted_verdict = "true" if nn_result['vulnerability_score'] <= threshold else "false"
-        expected_verdict_str = "true" if expected_verdict else "false"
-        if predicted_verdict == expected_verdict_str:
-            correct_predictions += 1
-        results.append([
-            base_name,
-            property_name,
-            expected_verdict_str,
-            predicted_verdict,
-            f"{nn_result['vulnerability_score']:.4f}",
-            f"{nn_result['confidence']:.4f}",
-            f"{execution_time:.2f}s"
-        ])
+        execution_time = nn_result['time']
+        for prop in properties:
+            property_file = prop['property_file'] or 'unknown'
+            property_name = os.path.basename(property_file)
+            expected_verdict = prop['verdict']
+            if expected_verdict is None:
+                print(f"No expected verdict for property {property_name} in {base_name}")
+                properties_with_no_verdict += 1
+                continue
+            properties_analyzed += 1    
+            all_expected_verdicts.append(expected_verdict)
+            expected_verdict_str = "true" if expected_verdict else "false"
+            if predicted_verdict == expected_verdict_str:
+                correct_predictions += 1
+            csv_append(csv_file, [
+                base_name,
+                property_name,
+                expected_verdict_str,
+                predicted_verdict,
+                f"{nn_result['vulnerability_score']:.4f}",
+                f"{nn_result['confidence']:.4f}",
+                f"{execution_time:.2f}s"
+            ])
+csv_file.close()
+print(f"Scored {files_scored} files")
+if use_cache:
+    prune_cache()
 
 print(compute_baseline_stats(all_expected_verdicts))
+#creating the table, sorted from the rows already written to the CSV
+results = read_csv_rows(csv_filename)
 results.sort(key=lambda x: (x[0], x[1]))
-#creating the table
-timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-report_filename = f"NN_bugs{timestamp}.txt"
-headers = ["Benchmark", "Property", "Expected Verdict", "Predicted Verdict", 
-           "Bug Confidence Score", "Model Confidence", "Analysis Time"]
 table = tabulate(results, headers=headers, tablefmt="grid")
 accuracy = correct_predictions / properties_analyzed if properties_analyzed else 0.0
 with open(report_filename, "w") as f:
@@ -128,12 +129,14 @@ with open(report_filename, "w") as f:
     f.write(f"\n\nSummary: {properties_analyzed} properties analyzed, "
             f"{properties_with_no_verdict} properties without verdict, "
             f"accuracy = {accuracy:.2%}\n")
+    if use_cache:
+        f.write(stats_line() + "\n")
+    for line in phase_lines([{'phases': phases}]) + cascade_lines(stage_stats):
+        f.write(line + "\n")
 print(f"\nSummary: {properties_analyzed} properties analyzed, "
       f"{properties_with_no_verdict} properties without verdict, "
       f"accuracy = {accuracy:.2%}")
-csv_filename = f"NN_bugs{timestamp}.csv"
-with open(csv_filename, "w") as f:
-    f.write(",".join(headers) + "\n")
-    for row in results:
-        cleaned_row = [str(cell).replace(",", ";") for cell in row]
-        f.write(",".join(cleaned_row) + "\n")
\ No newline at end of file
+if use_cache:
+    print(stats_line())
+for line in phase_lines([{'phases': phases}]) + cascade_lines(stage_stats):
+    print(line)
@@ -0,0 +1,159 @@
+import os
+import time
+import hashlib
+import argparse
+from datetime import datetime
+import numpy as np
+from tabulate import tabulate
+from result_cache import cache_dir
+
+#interchangeable inference backends for the VulBERTa model, all of them look like a transformers model to
+#nn_inference: model(**batch).logits, plus the original model.config
+#  pytorch - the full precision model as downloaded
+#  int8    - dynamic int8 quantization of the Linear layers, built in memory at load time (takes seconds)
+#  onnx    - ONNX Runtime session with all graph optimizations, the export is cached on disk and reused
+backends = ['pytorch', 'int8', 'onnx']
+onnx_dir = os.path.join(cache_dir, "onnx")
+onnx_threads = None #intra-op threads for ONNX Runtime, None uses one per core
+onnx_opset = 14
+
+def backend_tag(backend):
+    #appended to the model version in cache keys, the fp32 scores keep the keys they had before backends existed
+    return [] if backend == 'pytorch' else [backend]
+
+class OnnxModel:
+    def __init__(self, session, config):
+        self.session = session
+        self.config = config
+        self.input_names = [i.name for i in session.get_inputs()]
+
+    def __call__(self, **batch):
+        import torch
+        feed = {name: np.asarray(batch[name], dtype=np.int64) for name in self.input_names if name in batch}
+        logits = self.session.run(None, feed)[0]
+        return OnnxOutput(torch.from_numpy(logits))
+
+class OnnxOutput:
+    def __init__(self, logits):
+        self.logits = logits
+
+def onnx_path(model_name, config):
+    commit = getattr(config, '_commit_hash', None) or 'unknown'
+    digest = hashlib.sha256(f"{model_name}\0{commit}\0{onnx_opset}".encode()).hexdigest()[:16]
+    return os.path.join(onnx_dir, f"{model_name.replace('/', '_')}-{digest}.onnx")
+
+def export_onnx(model, tokenizer, path):
+    import torch
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sample = tokenizer(["int main() { return 0; }"], return_tensors="pt")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    #plain tuple outputs, the exporter names the first one logits
+    model.config.return_dict = False
+    with torch.no_grad():
+        torch.onnx.export(model, (sample['input_ids'], sample['attention_mask']), tmp_path,
+                          input_names=['input_ids', 'attention_mask'], output_names=['logits'],
+                          dynamic_axes={'input_ids': {0: 'batch', 1: 'sequence'},
+                                        'attention_mask': {0: 'batch', 1: 'sequence'},
+                                        'logits': {0: 'batch'}},
+                          opset_version=onnx_opset)
+    os.replace(tmp_path, path)
+
+def load_backend(backend, model_name):
+    #returns (tokenizer, model) for the backend, torch and transformers are only imported here
+    if backend not in backends:
+        raise ValueError(f"Unknown backend: {backend} (expected one of {', '.join(backends)})")
+    import torch
+    from transformers import AutoTokenizer, AutoConfig, AutoModelForSequenceClassification
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == 'onnx':
+        import onnxruntime
+        #the PyTorch weights are only loaded when the export for this model revision doesn't exist yet
+        config = AutoConfig.from_pretrained(model_name)
+        path = onnx_path(model_name, config)
+        if not os.path.exists(path):
+            print(f"Exporting {model_name} to {path}...")
+            model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            model.eval()
+            export_onnx(model, tokenizer, path)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = onnx_threads or os.cpu_count() or 1
+        session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        return tokenizer, OnnxModel(session, config)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    if backend == 'int8':
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
+
+def compare_backends(codes, model_name, names, threshold, batch_size):
+    #scores the same sources with every backend, the first one is the reference for the parity columns
+    from nn_inference import run_model_batched
+    rows = []
+    reference = None
+    for name in names:
+        tokenizer, model = load_backend(name, model_name)
+        #one small warm-up batch so lazy initialisation doesn't count towards the latency
+        run_model_batched(codes[:1], tokenizer, model, batch_size=batch_size)
+        start_time = time.time()
+        results = run_model_batched(codes, tokenizer, model, batch_size=batch_size)
+        elapsed = time.time() - start_time
+        scores = np.array([r['vulnerability_score'] for r in results])
+        if reference is None:
+            reference = scores
+        diff = np.abs(scores - reference)
+        agreement = np.mean((scores <= threshold) == (reference <= threshold)) if len(scores) else 1.0
+        rows.append({
+            'backend': name,
+            'files': len(codes),
+            'latency_ms': 1000 * elapsed / len(codes) if codes else 0.0,
+            'throughput': len(codes) / elapsed if elapsed > 0 else 0.0,
+            'max_diff': float(diff.max()) if len(diff) else 0.0,
+            'mean_diff': float(diff.mean()) if len(diff) else 0.0,
+            'agreement': float(agreement)
+        })
+    return rows
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the inference backends on the benchmark sources")
+    parser.add_argument('directories', nargs='*', default=['sv-benchmarks/c/floats-esbmc-regression'])
+    parser.add_argument('--model', default="claudios/VulBERTa-MLP-Devign")
+    parser.add_argument('--backends', default=','.join(backends),
+                        help="comma separated, the first one is the reference for the parity check")
+    parser.add_argument('--threshold', type=float, default=0.85, help="verdict threshold for the agreement column")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--limit', type=int, default=None, help="only score the first N files")
+    return parser.parse_args()
+
+def main():
+    from benchmark_index import load_index
+    args = parse_args()
+    codes = []
+    for entry in load_index(args.directories):
+        if entry['c_path'] is None:
+            continue
+        if args.limit is not None and len(codes) >= args.limit:
+            break
+        with open(entry['c_path'], 'r') as f:
+            codes.append(f.read())
+    if not codes:
+        print("No benchmark sources found.")
+        exit(1)
+    names = [name.strip() for name in args.backends.split(',') if name.strip()]
+    print(f"Scoring {len(codes)} files with {', '.join(names)}...")
+    rows = compare_backends(codes, args.model, names, args.threshold, args.batch_size)
+    headers = ["Backend", "Files", "Latency (ms/file)", "Throughput (files/s)",
+               f"Max |diff| vs {names[0]}", f"Mean |diff| vs {names[0]}", "Verdict Agreement"]
+    table = tabulate([[r['backend'], r['files'], f"{r['latency_ms']:.2f}", f"{r['throughput']:.2f}",
+                       f"{r['max_diff']:.6f}", f"{r['mean_diff']:.6f}", f"{r['agreement']:.2%}"] for r in rows],
+                     headers=headers, tablefmt="grid")
+    print(table)
+    report_filename = f"backend_comparison_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+    with open(report_filename, "w") as f:
+        f.write(f"Inference Backend Comparison - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(table)
+        f.write(f"\n\nThreshold for verdict agreement: {args.threshold}\n")
+    print(f"Report saved to {report_filename}")
+
+if __name__ == '__main__':
+    main()
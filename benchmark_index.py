@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+import yaml
+from concurrent.futures import ProcessPoolExecutor
+try:
+    #libyaml is several times faster when PyYAML was built against it
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+#one scan of the benchmark directories shared by CBMC.py, NN.py, NN+CBMC.py and calibrate.py
+#every .yml is parsed once and kept in an on-disk index together with its input file's hash, an entry is
+#only parsed again when the mtime or size of the .yml or of its input file changes
+index_path = os.path.join(os.getcwd(), ".benchmark_index.json")
+index_version = 1
+parallel_parse_min = 64 #below this many files to parse a process pool costs more than it saves
+_entries = {} #absolute .yml path -> entry, forked workers inherit whatever main() loaded
+
+def normalize_verdict(raw_verdict):
+    #expected_verdict as a bool, None when the property has none
+    if raw_verdict is None:
+        return None
+    if isinstance(raw_verdict, bool):
+        return raw_verdict
+    if isinstance(raw_verdict, str):
+        return raw_verdict.lower() == 'true'
+    return bool(raw_verdict)
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def parse_benchmark(yml_path):
+    #a load error is kept in the entry instead of raised, so one broken file doesn't stop the scan
+    yml_path = os.path.abspath(yml_path)
+    entry = {
+        'yml_stamp': _stamp(yml_path),
+        'meta': None,
+        'error': None,
+        'input_file': None,
+        'input_stamp': None,
+        'input_sha256': None,
+        'properties': []
+    }
+    try:
+        with open(yml_path, 'r') as f:
+            meta = yaml.load(f, Loader=SafeLoader)
+    except Exception as e:
+        entry['error'] = str(e)
+        return entry
+    entry['meta'] = meta
+    if not isinstance(meta, dict):
+        return entry
+    input_file = meta.get('input_files')
+    if isinstance(input_file, str):
+        c_file = os.path.join(os.path.dirname(yml_path), input_file)
+        entry['input_file'] = c_file
+        entry['input_stamp'] = _stamp(c_file)
+        if entry['input_stamp'] is not None:
+            entry['input_sha256'] = _sha256(c_file)
+    entry['properties'] = [{
+        'property_file': prop.get('property_file'),
+        'expected_verdict': prop.get('expected_verdict'),
+        'verdict': normalize_verdict(prop.get('expected_verdict'))
+    } for prop in meta.get('properties', []) if isinstance(prop, dict)]
+    return entry
+
+def _fresh(entry, yml_path):
+    if entry.get('yml_stamp') != _stamp(yml_path):
+        return False
+    return entry['input_file'] is None or entry['input_stamp'] == _stamp(entry['input_file'])
+
+def _read_index(path):
+    try:
+        with open(path, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict) or index.get('version') != index_version:
+        return {}
+    return index.get('entries', {})
+
+def _write_index(path, entries):
+    #written to a temporary file first so a crash never leaves a half-written index behind
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': index_version, 'entries': entries}, f, separators=(',', ':'), default=str)
+    os.replace(tmp_path, path)
+
+def load_index(directories, path=None, workers=None):
+    #returns one entry per .yml in the directories, with 'yml_path', 'name', 'dir' and 'c_path' (the .c file
+    #with the same name, or None) added, stale and new files are parsed in parallel and the index saved
+    path = path or index_path
+    stored = _read_index(path)
+    found = []
+    for directory in directories:
+        if not os.path.isdir(directory):
+            print(f"Warning: Directory {directory} does not exist or is not accessible")
+            continue
+        with os.scandir(directory) as it:
+            names = sorted(e.name for e in it if e.is_file())
+        c_names = {name for name in names if name.endswith('.c')}
+        for name in names:
+            if name.endswith('.yml'):
+                base_name = name[:-len('.yml')]
+                found.append((directory, base_name, os.path.join(directory, name),
+                              os.path.join(directory, base_name + '.c') if base_name + '.c' in c_names else None))
+    keys = [os.path.abspath(yml_path) for _, _, yml_path, _ in found]
+    stale = [key for key in dict.fromkeys(keys) if key not in stored or not _fresh(stored[key], key)]
+    if stale:
+        print(f"Indexing {len(stale)} of {len(keys)} benchmark YAML files...")
+        if len(stale) >= parallel_parse_min:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = list(pool.map(parse_benchmark, stale, chunksize=32))
+        else:
+            parsed = [parse_benchmark(key) for key in stale]
+        stored.update(zip(stale, parsed))
+    #drop files that disappeared from the scanned directories, entries for other directories are kept
+    scanned = {os.path.abspath(directory) for directory in directories}
+    seen = set(keys)
+    removed = [key for key in stored if os.path.dirname(key) in scanned and key not in seen]
+    for key in removed:
+        del stored[key]
+    if stale or removed:
+        try:
+            _write_index(path, stored)
+        except OSError as e:
+            print(f"Warning: could not save the benchmark index: {e}")
+    _entries.update(stored)
+    return [dict(stored[key], yml_path=yml_path, name=base_name, dir=directory, c_path=c_path)
+            for key, (directory, base_name, yml_path, c_path) in zip(keys, found)]
+
+def benchmark_entry(yml_path):
+    #the indexed entry when it is still fresh, otherwise the file is parsed again
+    key = os.path.abspath(yml_path)
+    entry = _entries.get(key)
+    if entry is None or not _fresh(entry, key):
+        entry = parse_benchmark(key)
+        _entries[key] = entry
+    return entry
+
+def load_meta(yml_path):
+    #drop-in for yaml.safe_load on a benchmark .yml, raises when the file couldn't be loaded
+    entry = benchmark_entry(yml_path)
+    if entry['error'] is not None:
+        raise ValueError(entry['error'])
+    return entry['meta']
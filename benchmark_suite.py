@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import hashlib
+import zipfile
+import platform
+import subprocess
+import argparse
+from datetime import datetime
+from tabulate import tabulate
+from result_cache import cache_dir, tool_version
+from benchmark_index import load_index
+from profiling import phase_names, add_phases, phase_totals
+
+#fixed-sample timing run to catch throughput regressions between versions
+#the bundled "Simpler Benchmarks.zip" is extracted once, the same evenly spaced sample of its benchmarks is
+#verified one at a time without the result cache, and the per-benchmark phase timings go into a JSON report
+#that --compare checks against the report of an earlier version
+suite_zip = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Simpler Benchmarks.zip")
+suite_dir = os.path.join(cache_dir, "suite")
+sample_size = 40
+report_version = 1
+regression_tolerance = 0.10 #a phase this much slower (or throughput this much lower) counts as a regression
+min_phase_seconds = 0.05 #phases shorter than this in both runs are too noisy to compare
+
+def extract_suite(zip_path=suite_zip, target=suite_dir):
+    #returns the directory the zip was extracted to, one directory per zip content so an update re-extracts
+    with open(zip_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    root = os.path.join(target, digest)
+    if os.path.isdir(root):
+        return root, digest
+    tmp_root = f"{root}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(zip_path) as archive:
+        #leave out the macOS resource forks the zip was packed with
+        members = [name for name in archive.namelist()
+                   if not name.startswith('__MACOSX/') and not os.path.basename(name).startswith('._')]
+        archive.extractall(tmp_root, members)
+    os.replace(tmp_root, root)
+    return root, digest
+
+def suite_directories(root):
+    directories = []
+    for top in sorted(os.listdir(root)):
+        top_path = os.path.join(root, top)
+        if os.path.isdir(top_path):
+            directories.extend(os.path.join(top_path, name) for name in sorted(os.listdir(top_path))
+                               if os.path.isdir(os.path.join(top_path, name)))
+    return directories
+
+def pick_sample(entries, size=sample_size):
+    #evenly spaced over the sorted benchmarks, so the sample is the same on every machine and version
+    entries = sorted((entry for entry in entries if entry['error'] is None and entry['input_stamp'] is not None),
+                     key=lambda entry: (os.path.basename(entry['dir']), entry['name']))
+    if size >= len(entries):
+        return entries
+    return [entries[i * len(entries) // size] for i in range(size)]
+
+def run_verifier(sample, tool):
+    import CBMC
+    benchmarks = []
+    for entry in sample:
+        print(f"[{len(benchmarks) + 1}/{len(sample)}] {entry['name']}")
+        start_time = time.perf_counter()
+        _, result = CBMC.verify_job(entry['yml_path'], {'tool': tool, 'cache': False})
+        benchmarks.append({
+            'name': entry['name'],
+            'dir': os.path.basename(entry['dir']),
+            'verdict': CBMC.result_verdict(result),
+            'match': CBMC.match_label(result['match']),
+            'time': time.perf_counter() - start_time,
+            'phases': result.get('phases') or {}
+        })
+    return benchmarks
+
+def run_model(sample, benchmarks, model_name, backend):
+    #scores the sample through the NN pipeline and adds its phases to the benchmarks from run_verifier
+    from inference_service import LocalScorer
+    from pipeline import score_stream
+    by_name = {(b['dir'], b['name']): b for b in benchmarks}
+    scorer = LocalScorer(model_name, backend)
+    start_time = time.perf_counter()
+    scored = 0
+    for chunk in score_stream(sample, scorer, use_cache=False):
+        for pair, _ in chunk:
+            benchmark = by_name[(os.path.basename(os.path.dirname(pair['yml_path'])), pair['name'])]
+            add_phases(benchmark['phases'], pair['phases'])
+            scored += 1
+    return scored, time.perf_counter() - start_time
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def build_report(benchmarks, wall_time, tool, digest, nn=None):
+    totals = phase_totals(benchmarks)
+    report = {
+        'version': report_version,
+        'created': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'tool': tool,
+        'tool_version': tool_version('cbmc') if tool == 'cbmc' else None,
+        'suite': digest,
+        'sample': [f"{b['dir']}/{b['name']}" for b in benchmarks],
+        'wall_time': wall_time,
+        'throughput': len(benchmarks) / wall_time if wall_time > 0 else 0.0,
+        'phases': {name: totals[name] for name in phase_names if name in totals},
+        'peak_rss_kb': totals.get('peak_rss_kb', 0),
+        'matches': sum(b['match'] == "MATCH" for b in benchmarks),
+        'benchmarks': benchmarks
+    }
+    if nn is not None:
+        report['nn'] = nn
+    return report
+
+def compare_reports(baseline, current, tolerance=regression_tolerance):
+    #returns (rows, regressions), one row per phase plus throughput and peak memory
+    rows = []
+    regressions = []
+    def add(name, old, new, higher_is_worse=True, minimum=0.0):
+        if old is None or new is None:
+            return
+        ratio = new / old if old else None
+        if higher_is_worse:
+            worse = max(old, new) >= minimum and new > old * (1 + tolerance)
+        else:
+            worse = new < old * (1 - tolerance)
+        rows.append([name, f"{old:.3f}", f"{new:.3f}", f"{ratio:.2f}x" if ratio is not None else "n/a",
+                     "REGRESSION" if worse else ""])
+        if worse:
+            regressions.append(name)
+    add('throughput (benchmarks/s)', baseline['throughput'], current['throughput'], higher_is_worse=False)
+    add('wall_time (s)', baseline['wall_time'], current['wall_time'])
+    for name in phase_names:
+        add(f"{name} (s)", baseline['phases'].get(name), current['phases'].get(name), minimum=min_phase_seconds)
+    if baseline.get('peak_rss_kb') and current.get('peak_rss_kb'):
+        add('peak_rss (MB)', baseline['peak_rss_kb'] / 1024, current['peak_rss_kb'] / 1024)
+    return rows, regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time a fixed sample of the bundled benchmarks phase by phase")
+    parser.add_argument('--tool', choices=['cbmc', 'cpachecker'], default='cbmc')
+    parser.add_argument('--sample', type=int, default=sample_size, help="number of benchmarks in the sample")
+    parser.add_argument('--nn', action='store_true', help="also score the sample with the model")
+    parser.add_argument('--model', default="claudios/VulBERTa-MLP-Devign")
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--output', help="report path, benchmark_suite_<timestamp>.json by default")
+    parser.add_argument('--compare', metavar='BASELINE', help="earlier report to check this run against")
+    parser.add_argument('--tolerance', type=float, default=regression_tolerance,
+                        help="slowdown ratio reported as a regression")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('version') != report_version:
+            print(f"{args.compare} is a version {baseline.get('version')} report, expected version {report_version}")
+            exit(1)
+    root, digest = extract_suite()
+    entries = load_index(suite_directories(root), path=os.path.join(root, ".benchmark_index.json"))
+    sample = pick_sample(entries, args.sample)
+    if not sample:
+        print(f"No benchmarks found in {suite_zip}")
+        exit(1)
+    print(f"Running {len(sample)} benchmarks from {os.path.basename(suite_zip)} with {args.tool}...")
+    start_time = time.perf_counter()
+    benchmarks = run_verifier(sample, args.tool)
+    wall_time = time.perf_counter() - start_time
+    nn = None
+    if args.nn:
+        scored, nn_time = run_model(sample, benchmarks, args.model, args.backend)
+        nn = {'model': args.model, 'backend': args.backend, 'files': scored, 'wall_time': nn_time}
+    report = build_report(benchmarks, wall_time, args.tool, digest, nn)
+    output = args.output or f"benchmark_suite_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    phase_table = tabulate([[name, f"{seconds:.3f}"] for name, seconds in report['phases'].items()],
+                           headers=["Phase", "Seconds"], tablefmt="grid")
+    print(phase_table)
+    print(f"{len(benchmarks)} benchmarks in {wall_time:.2f}s ({report['throughput']:.2f}/s), "
+          f"{report['matches']} matches, peak verifier RSS {report['peak_rss_kb'] / 1024:.1f} MB")
+    print(f"Report saved to {output}")
+    if baseline is None:
+        return
+    if baseline.get('sample') != report['sample'] or baseline.get('tool') != report['tool']:
+        print(f"Warning: {args.compare} ran a different sample or tool, the comparison is only indicative")
+    rows, regressions = compare_reports(baseline, report, args.tolerance)
+    print(f"\nCompared with {args.compare} ({baseline.get('commit') or 'unknown commit'})")
+    print(tabulate(rows, headers=["Metric", "Baseline", "Current", "Ratio", ""], tablefmt="grid"))
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        exit(1)
+
+if __name__ == '__main__':
+    main()
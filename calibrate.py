@@ -0,0 +1,191 @@
+import os
+import json
+import argparse
+from datetime import datetime
+import numpy as np
+from tabulate import tabulate
+from benchmark_index import load_index
+from backends import backends
+
+#scores every benchmark with the NN once, stores the scores, and then sweeps every possible verdict threshold
+#over the stored scores, so picking the NN.py / NN+CBMC.py threshold doesn't need another model run
+benchmark_dirs = [
+    'sv-benchmarks/c/floats-esbmc-regression'
+]
+model_name = "claudios/VulBERTa-MLP-Devign"
+scores_file = "nn_scores.json"
+calibration_file = "calibration.json"
+#rows whose score is within this distance of the threshold would be escalated to CBMC
+escalation_margin = 0.1
+
+def find_file_pairs(directories):
+    #same pairing as NN.py: each .c file with the .yml of the same name, taken from the benchmark index
+    return [{'name': entry['name'], 'dir': entry['dir'], 'c_path': entry['c_path'], 'yml_path': entry['yml_path'],
+             'properties': entry['properties']}
+            for entry in load_index(directories) if entry['c_path'] is not None]
+
+def score_pairs(pairs, backend='pytorch'):
+    #the only step that needs the model, through the inference daemon when one is running
+    from inference_service import connect_scorer
+    from result_cache import cache_key, cached_batch
+    scorer = connect_scorer(model_name, backend)
+    codes = []
+    for pair in pairs:
+        with open(pair['c_path'], 'r') as f:
+            codes.append(f.read())
+    #same key as the truncating mode of NN.py and NN+CBMC.py, so their cached scores are reused
+    keys = [cache_key('model', scorer.version(), code) for code in codes]
+    def score_missing(missing):
+        values = scorer.score(scorer.encode([codes[i] for i in missing]))
+        #phase timings describe this run only, they stay out of the shared cache
+        for value in values:
+            value.pop('phases', None)
+        return values
+    return cached_batch(keys, score_missing)
+
+def build_score_rows(pairs, nn_results):
+    rows = []
+    for pair, nn_result in zip(pairs, nn_results):
+        for prop in pair['properties']:
+            expected_verdict = prop['verdict']
+            if expected_verdict is None:
+                continue
+            property_name = os.path.basename(prop['property_file'] or 'unknown')
+            rows.append({
+                'name': pair['name'],
+                'directory': os.path.basename(os.path.normpath(pair['dir'])),
+                'property': os.path.splitext(property_name)[0],
+                'expected': bool(expected_verdict),
+                'score': nn_result['vulnerability_score']
+            })
+    return rows
+
+def threshold_sweep(scores, expected):
+    #every distinct score is a candidate threshold, a row is predicted "true" (no bug) when score <= threshold
+    #counts come from one sort and a cumulative sum, so the cost is O(n log n) for all thresholds together
+    order = np.argsort(scores, kind='stable')
+    sorted_scores = scores[order]
+    sorted_bug = ~expected[order]
+    thresholds = np.unique(np.concatenate(([0.0], sorted_scores, [1.0])))
+    predicted_true = np.searchsorted(sorted_scores, thresholds, side='right')
+    bugs_below = np.concatenate(([0], np.cumsum(sorted_bug)))[predicted_true]
+    total = len(scores)
+    total_bugs = int(sorted_bug.sum())
+    total_safe = total - total_bugs
+    #a bug is the positive class: true positives are bugs scored above the threshold
+    tp = total_bugs - bugs_below
+    fp = (total - predicted_true) - tp
+    tn = predicted_true - bugs_below
+    flagged = tp + fp
+    precision = np.divide(tp, flagged, out=np.ones(len(thresholds)), where=flagged > 0)
+    recall = tp / total_bugs if total_bugs else np.zeros(len(thresholds))
+    fpr = fp / total_safe if total_safe else np.zeros(len(thresholds))
+    return {
+        'thresholds': thresholds,
+        'accuracy': (tp + tn) / total,
+        'precision': precision,
+        'recall': recall,
+        'fpr': fpr
+    }
+
+def area_under(x, y):
+    #points with the same x are ordered by y too, so a vertical step is walked upwards and its area counted
+    order = np.lexsort((y, x))
+    x = x[order]
+    y = y[order]
+    return float(np.sum(np.diff(x) * (y[1:] + y[:-1]) / 2))
+
+def summarize(label, scores, expected, margin=escalation_margin):
+    sweep = threshold_sweep(scores, expected)
+    best = int(np.argmax(sweep['accuracy']))
+    best_threshold = float(sweep['thresholds'][best])
+    #average precision: precision weighted by each step in recall as the threshold drops
+    recall = sweep['recall']
+    average_precision = float(np.sum((recall[:-1] - recall[1:]) * sweep['precision'][:-1]))
+    escalations = int(np.sum(np.abs(scores - best_threshold) < margin))
+    return {
+        'group': label,
+        'rows': len(scores),
+        'threshold': best_threshold,
+        'accuracy': float(sweep['accuracy'][best]),
+        'precision': float(sweep['precision'][best]),
+        'recall': float(recall[best]),
+        'roc_auc': area_under(sweep['fpr'], recall),
+        'average_precision': average_precision,
+        'escalations': escalations,
+        'sweep': sweep
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Calibrate the NN verdict threshold from stored scores")
+    parser.add_argument('--rescore', action='store_true', help="run the model again even if stored scores exist")
+    parser.add_argument('--scores', default=scores_file, help="where the scores are stored")
+    parser.add_argument('--margin', type=float, default=escalation_margin,
+                        help="distance from the threshold at which a row counts as a CBMC escalation")
+    parser.add_argument('--backend', default='pytorch', choices=backends,
+                        help="inference backend used when scoring, see backends.py")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if os.path.exists(args.scores) and not args.rescore:
+        with open(args.scores, 'r') as f:
+            rows = json.load(f)
+        print(f"Loaded {len(rows)} stored scores from {args.scores}")
+    else:
+        pairs = find_file_pairs(benchmark_dirs)
+        print(f"Scoring {len(pairs)} files...")
+        rows = build_score_rows(pairs, score_pairs(pairs, args.backend))
+        with open(args.scores, 'w') as f:
+            json.dump(rows, f)
+        print(f"Scores saved to {args.scores}")
+    if not rows:
+        print("No properties with expected verdicts to calibrate on.")
+        exit(1)
+    scores = np.array([row['score'] for row in rows], dtype=float)
+    expected = np.array([row['expected'] for row in rows], dtype=bool)
+    directories = np.array([row['directory'] for row in rows])
+    properties = np.array([row['property'] for row in rows])
+    summaries = [summarize("all", scores, expected, args.margin)]
+    for directory in sorted(set(directories)):
+        mask = directories == directory
+        summaries.append(summarize(f"dir: {directory}", scores[mask], expected[mask], args.margin))
+    for prop in sorted(set(properties)):
+        mask = properties == prop
+        summaries.append(summarize(f"property: {prop}", scores[mask], expected[mask], args.margin))
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    headers = ["Group", "Rows", "Best Threshold", "Accuracy", "Precision", "Recall",
+               "ROC AUC", "Avg Precision", "CBMC Escalations"]
+    table = tabulate([[s['group'], s['rows'], f"{s['threshold']:.4f}", f"{s['accuracy']:.2%}",
+                       f"{s['precision']:.2%}", f"{s['recall']:.2%}", f"{s['roc_auc']:.4f}",
+                       f"{s['average_precision']:.4f}", f"{s['escalations']} ({s['escalations'] / s['rows']:.2%})"]
+                      for s in summaries], headers=headers, tablefmt="grid")
+    print(table)
+    overall = summaries[0]
+    report_filename = f"calibration_{timestamp}.txt"
+    with open(report_filename, "w") as f:
+        f.write(f"Threshold Calibration Report - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(table)
+        f.write(f"\n\nBest overall threshold: {overall['threshold']:.4f} "
+                f"(accuracy {overall['accuracy']:.2%}, {overall['escalations']} rows within "
+                f"{args.margin} of it would be escalated to CBMC)\n")
+    #full curves for the overall group, for plotting ROC and PR curves
+    csv_filename = f"calibration_{timestamp}.csv"
+    sweep = overall['sweep']
+    with open(csv_filename, "w") as f:
+        f.write("Threshold,Accuracy,Precision,Recall,False Positive Rate\n")
+        for values in zip(sweep['thresholds'], sweep['accuracy'], sweep['precision'], sweep['recall'], sweep['fpr']):
+            f.write(",".join(f"{v:.6f}" for v in values) + "\n")
+    with open(calibration_file, "w") as f:
+        json.dump({
+            'threshold': overall['threshold'],
+            'accuracy': overall['accuracy'],
+            'escalation_margin': args.margin,
+            'groups': {s['group']: s['threshold'] for s in summaries}
+        }, f, indent=2)
+    print(f"\nBest overall threshold: {overall['threshold']:.4f} (accuracy {overall['accuracy']:.2%})")
+    print(f"Report saved to {report_filename}, curves saved to {csv_filename}, threshold saved to {calibration_file}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import argparse
+import numpy as np
+from benchmark_index import load_index
+from inference_service import connect_scorer
+from nn_inference import select_encoded, batch_size as default_batch_size
+from triage import in_uncertainty_band
+from profiling import add_phases
+
+#early-exit model cascade for NN.py and NN+CBMC.py: the files are scored by the cheapest model first and only
+#the ones whose score falls in that model's uncertainty band go on to the next, so the full VulBERTa model only
+#runs on the files the cheaper ones can't decide
+#a stage is (model, band), model is 'linear' for the bag-of-tokens scorer below or a hugging face model name,
+#the last stage's band is ignored since every file that gets there is resolved there, every other band has to
+#contain the verdict threshold, so a file leaves the cascade early only when the final model is expected to put
+#it on the same side of the threshold
+#stages whose tokenizers are the same (a distilled VulBERTa and VulBERTa) tokenize each file only once
+#the cascade has the same interface as LocalScorer, so the pipeline and the result cache don't change
+benchmark_dirs = [
+    'sv-benchmarks/c/floats-esbmc-regression'
+]
+linear_model_file = "cascade_linear.json"
+scores_file = "nn_scores.json" #calibrate.py's stored VulBERTa scores, for --targets scores
+hash_buckets = 1 << 14
+learning_rate = 0.5
+epochs = 300
+l2 = 1e-4
+holdout_every = 5 #every n-th file is kept out of training to report how the model does on unseen files
+
+_tokens = re.compile(r'[A-Za-z_]\w*|\d+|==|!=|<=|>=|&&|\|\||->|\+\+|--|<<|>>|\S')
+
+def token_vector(code, buckets=hash_buckets):
+    #hashed counts of tokens and token pairs, log scaled and normalized so long files don't dominate
+    tokens = _tokens.findall(code)
+    vector = np.zeros(buckets, dtype=np.float32)
+    for token in tokens:
+        vector[zlib.crc32(token.encode('utf-8')) % buckets] += 1
+    for first, second in zip(tokens, tokens[1:]):
+        vector[zlib.crc32(f"{first} {second}".encode('utf-8')) % buckets] += 1
+    vector = np.log1p(vector)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30, 30)))
+
+def train_linear(vectors, targets):
+    #logistic regression by full-batch gradient descent, targets are 0..1 bug scores
+    x = np.asarray(vectors, dtype=np.float32)
+    y = np.asarray(targets, dtype=np.float32)
+    weights = np.zeros(x.shape[1], dtype=np.float32)
+    bias = float(np.log((y.mean() + 1e-3) / (1 - y.mean() + 1e-3)))
+    for _ in range(epochs):
+        error = sigmoid(x @ weights + bias) - y
+        weights -= learning_rate * (x.T @ error / len(y) + l2 * weights)
+        bias -= learning_rate * float(error.mean())
+    return weights, bias
+
+class LinearScorer:
+    #bag-of-tokens logistic regression trained by `python cascade.py`, microseconds per file
+    def __init__(self, path=linear_model_file):
+        self.path = path
+        with open(path, 'r') as f:
+            model = json.load(f)
+        self.buckets = model['buckets']
+        self.weights = np.array(model['weights'], dtype=np.float32)
+        self.bias = model['bias']
+        self.digest = hashlib.sha256(json.dumps(model, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def version(self):
+        return ['linear', self.digest]
+
+    def encoding_key(self):
+        return ('linear', self.buckets)
+
+    def encode(self, codes):
+        if not codes:
+            return None
+        vectors, times = [], []
+        for code in codes:
+            start = time.perf_counter()
+            vectors.append(token_vector(code, self.buckets))
+            times.append(time.perf_counter() - start)
+        return {'vectors': vectors, 'times': times}
+
+    def score(self, encoded):
+        if encoded is None:
+            return []
+        start = time.perf_counter()
+        scores = sigmoid(np.asarray(encoded['vectors']) @ self.weights + self.bias)
+        inference_time = (time.perf_counter() - start) / len(scores)
+        return [{
+            'vulnerability_score': float(score),
+            'confidence': float(max(score, 1 - score)),
+            'time': tokenize_time + inference_time,
+            'phases': {'tokenize': tokenize_time, 'inference': inference_time}
+        } for score, tokenize_time in zip(scores, encoded['times'])]
+
+    def select(self, encoded, indices):
+        #the encoding of a subset of the files, their tokenize time was already counted
+        return {'vectors': [encoded['vectors'][i] for i in indices], 'times': [0.0] * len(indices)}
+
+class CascadeScorer:
+    def __init__(self, stages):
+        #stages is a list of (name, scorer, band)
+        self.stages = stages
+
+    def version(self):
+        return ['cascade'] + [[name, scorer.version(), list(band) if band else None]
+                              for name, scorer, band in self.stages]
+
+    def encode(self, codes):
+        #only the first stage sees every file, the later ones encode the files that reach them in score
+        if not codes:
+            return None
+        return {'codes': list(codes), 'first': self.stages[0][1].encode(codes)}
+
+    def _stage_encoding(self, scorer, codes, indices, encodings):
+        #reuses an earlier stage's encoding when the tokenizer and window settings are the same
+        key = getattr(scorer, 'encoding_key', lambda: None)()
+        if key is not None and key in encodings:
+            encoded, covered = encodings[key]
+            position = {index: k for k, index in enumerate(covered)}
+            select = getattr(scorer, 'select', None) or select_encoded
+            return select(encoded, [position[i] for i in indices])
+        encoded = scorer.encode([codes[i] for i in indices])
+        if key is not None:
+            encodings[key] = (encoded, indices)
+        return encoded
+
+    def score(self, encoded):
+        #one result per file from the stage that resolved it, 'time' and 'phases' add up every stage it went
+        #through, 'stage' names the resolving stage and 'stage_index' is its position
+        if encoded is None:
+            return []
+        codes = encoded['codes']
+        results = [None] * len(codes)
+        spent = [0.0] * len(codes)
+        phases = [{} for _ in codes]
+        remaining = list(range(len(codes)))
+        encodings = {}
+        last = len(self.stages) - 1
+        for number, (name, scorer, band) in enumerate(self.stages):
+            if number == 0:
+                stage_encoded = encoded['first']
+                key = getattr(scorer, 'encoding_key', lambda: None)()
+                if key is not None:
+                    encodings[key] = (stage_encoded, remaining)
+            else:
+                stage_encoded = self._stage_encoding(scorer, codes, remaining, encodings)
+            passed_on = []
+            for i, value in zip(remaining, scorer.score(stage_encoded)):
+                spent[i] += value['time']
+                add_phases(phases[i], value.pop('phases', None))
+                if number < last and band is not None and in_uncertainty_band(value, band):
+                    passed_on.append(i)
+                    continue
+                value.update({'time': spent[i], 'phases': phases[i], 'stage': name, 'stage_index': number})
+                results[i] = value
+            remaining = passed_on
+            if not remaining:
+                break
+        return results
+
+def short_name(model):
+    return model.rsplit('/', 1)[-1]
+
+def check_bands(stages, threshold):
+    #raises ValueError for a stage before the last whose band would resolve files on either side of threshold
+    for model, band in stages[:-1]:
+        if band is None:
+            raise ValueError(f"cascade stage {model} needs a band, only the last stage resolves every file")
+        low, high = band
+        if not low <= threshold <= high:
+            raise ValueError(f"cascade stage {model} band {band} doesn't contain the threshold {threshold}, "
+                             f"files between the band and the threshold would get the other verdict early")
+
+def connect_cascade(stages, threshold, backend='pytorch', window_mode=False, window_aggregate='max', max_windows=16,
+                    batch_size=default_batch_size):
+    #stages as in NN.py's cascade_stages, [(model, band), ...], transformer stages go through connect_scorer
+    check_bands(stages, threshold)
+    built = []
+    for model, band in stages:
+        if model == 'linear':
+            scorer = LinearScorer()
+        else:
+            scorer = connect_scorer(model, backend, window_mode, window_aggregate, max_windows, batch_size)
+        built.append((short_name(model), scorer, band))
+    print("Cascade: " + " -> ".join(f"{name} {band}" if band and k < len(built) - 1 else name
+                                    for k, (name, _, band) in enumerate(built)))
+    return CascadeScorer(built)
+
+def tally_stage(stats, nn_result):
+    #counts a scored file towards the stage that resolved it, results from a plain scorer have no stage
+    if 'stage' not in nn_result:
+        return
+    key = (nn_result['stage_index'], nn_result['stage'])
+    count, seconds = stats.get(key, (0, 0.0))
+    stats[key] = (count + 1, seconds + nn_result['time'])
+
+def cascade_lines(stats):
+    #share of files resolved at each stage and the average latency of those files, over every stage they
+    #went through, empty when the run had no cascade
+    total = sum(count for count, _ in stats.values())
+    if not total:
+        return []
+    lines = ["Cascade resolution:"]
+    for (number, name), (count, seconds) in sorted(stats.items()):
+        lines.append(f"  stage {number + 1} {name}: {count} files ({count / total:.2%}), "
+                     f"{seconds / count * 1000:.2f} ms per file")
+    overall = sum(seconds for _, seconds in stats.values())
+    lines.append(f"  average latency: {overall / total * 1000:.2f} ms per file")
+    return lines
+
+def verdict_targets(entries):
+    #1.0 for files with a property expected to fail, 0.0 when every property with a verdict holds
+    targets = {}
+    for entry in entries:
+        verdicts = [prop['verdict'] for prop in entry['properties'] if prop['verdict'] is not None]
+        if verdicts:
+            targets[entry['c_path']] = 0.0 if all(verdicts) else 1.0
+    return targets
+
+def score_targets(entries, path):
+    #VulBERTa's own stored scores, so the linear stage learns to agree with the model it stands in for
+    with open(path, 'r') as f:
+        rows = json.load(f)
+    scores = {(row['directory'], row['name']): row['score'] for row in rows}
+    targets = {}
+    for entry in entries:
+        key = (os.path.basename(os.path.normpath(entry['dir'])), entry['name'])
+        if key in scores:
+            targets[entry['c_path']] = scores[key]
+    return targets
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the bag-of-tokens first stage of the NN cascade")
+    parser.add_argument('--targets', default='scores', choices=['scores', 'verdicts'],
+                        help="learn the VulBERTa scores stored by calibrate.py, so the stage's band means the same "
+                             "as the final model's, or the expected verdicts")
+    parser.add_argument('--scores', default=scores_file, help="stored scores for --targets scores")
+    parser.add_argument('--output', default=linear_model_file, help="where the model is written")
+    parser.add_argument('--threshold', type=float, default=0.85,
+                        help="verdict threshold of NN.py, held-out files are compared on this side of it")
+    parser.add_argument('--band', default="0.6,0.95",
+                        help="uncertainty band to report the held-out early-exit rate and accuracy for")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    low, high = (float(part) for part in args.band.split(','))
+    check_bands([('linear', (low, high)), ('final', None)], args.threshold)
+    entries = [entry for entry in load_index(benchmark_dirs) if entry['c_path'] is not None]
+    if args.targets == 'scores':
+        if not os.path.exists(args.scores):
+            print(f"No stored scores in {args.scores}, run calibrate.py first or train on --targets verdicts")
+            exit(1)
+        targets = score_targets(entries, args.scores)
+    else:
+        targets = verdict_targets(entries)
+    paths = sorted(targets)
+    if not paths:
+        print("No files with targets to train on.")
+        exit(1)
+    vectors = []
+    for path in paths:
+        with open(path, 'r') as f:
+            vectors.append(token_vector(f.read()))
+    vectors = np.array(vectors)
+    y = np.array([targets[path] for path in paths], dtype=np.float32)
+    held_out = np.arange(len(paths)) % holdout_every == holdout_every - 1
+    if held_out.any() and (~held_out).any():
+        weights, bias = train_linear(vectors[~held_out], y[~held_out])
+        scores = sigmoid(vectors[held_out] @ weights + bias)
+        decided = (scores < low) | (scores > high)
+        agree = (scores > args.threshold) == (y[held_out] > args.threshold)
+        print(f"Held out {held_out.sum()} files: {agree.mean():.2%} agree with the targets, "
+              f"{decided.mean():.2%} resolved outside ({low}, {high})"
+              + (f" with {agree[decided].mean():.2%} agreeing" if decided.any() else ""))
+    weights, bias = train_linear(vectors, y)
+    with open(args.output, 'w') as f:
+        json.dump({'buckets': hash_buckets, 'weights': weights.tolist(), 'bias': bias, 'targets': args.targets,
+                   'files': len(paths)}, f)
+    print(f"Trained on {len(paths)} files, model saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
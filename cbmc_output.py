@@ -0,0 +1,169 @@
+import re
+import json
+
+#structured CBMC results from --json-ui, parsed while CBMC is still writing them
+#the output is one JSON array of messages, each message is decoded on its own as soon as it is complete and
+#only a compact summary is kept, so the raw text (and traces) never pile up in the result dicts:
+#  status      - SUCCESS, FAILURE or UNKNOWN
+#  checks      - number of checks per status, e.g. {'SUCCESS': 12, 'FAILURE': 1}
+#  failed      - the failed checks as {'property', 'description', 'line', 'trace_length'}
+#  solver      - {'variables', 'clauses', 'sat_time', 'decision_time', 'vccs'} when CBMC reported them
+#  errors      - the first few error messages
+json_flags = ['--json-ui', '--trace']
+max_errors = 5
+
+_special = re.compile(r'[{}\[\]"\\]')
+_string_special = re.compile(r'["\\]')
+_variables = re.compile(r'^(\d+) variables, (\d+) clauses')
+_runtime = re.compile(r'^Runtime (Solver|decision procedure): ([\d.]+)s')
+_vccs = re.compile(r'^Generated \d+ VCC\(s\), (\d+) remaining')
+
+class JsonUiParser:
+    #feed() it stdout as it arrives, summary() once the process is done
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0 #how far the buffer has been scanned
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = None #where the message being scanned begins
+        self.cprover_status = None
+        self.checks = {}
+        self.failed = []
+        self.solver = {}
+        self.errors = []
+
+    def feed(self, text):
+        self.buffer += text
+        #the scan only stops at quotes, escapes and brackets, so long traces are skipped over quickly
+        while True:
+            if self.escaped:
+                #whatever follows a backslash, it may only arrive with the next chunk
+                if self.pos >= len(self.buffer):
+                    break
+                self.pos += 1
+                self.escaped = False
+            match = (_string_special if self.in_string else _special).search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                break
+            char = match.group()
+            self.pos = match.end()
+            if self.in_string:
+                if char == '\\':
+                    self.escaped = True
+                else:
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 1 and char == '{':
+                    self.start = match.start()
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 1 and self.start is not None:
+                    self.handle(json.loads(self.buffer[self.start:self.pos]))
+                    self.start = None
+        if self.start is None:
+            #nothing before the next message is needed any more
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+    def handle(self, message):
+        if 'cProverStatus' in message:
+            self.cprover_status = message['cProverStatus']
+        elif 'result' in message:
+            for check in message['result']:
+                status = check.get('status', 'UNKNOWN')
+                self.checks[status] = self.checks.get(status, 0) + 1
+                if status == 'FAILURE':
+                    self.failed.append({
+                        'property': check.get('property'),
+                        'description': check.get('description'),
+                        'line': (check.get('sourceLocation') or {}).get('line'),
+                        'trace_length': len(check.get('trace') or [])
+                    })
+        elif 'messageText' in message:
+            text = message['messageText']
+            if message.get('messageType') == 'ERROR':
+                if len(self.errors) < max_errors:
+                    self.errors.append(text)
+                return
+            match = _variables.match(text)
+            if match:
+                self.solver['variables'] = int(match.group(1))
+                self.solver['clauses'] = int(match.group(2))
+                return
+            match = _runtime.match(text)
+            if match:
+                name = 'sat_time' if match.group(1) == 'Solver' else 'decision_time'
+                self.solver[name] = self.solver.get(name, 0.0) + float(match.group(2))
+                return
+            match = _vccs.match(text)
+            if match:
+                self.solver['vccs'] = int(match.group(1))
+
+    def summary(self):
+        if self.failed or self.cprover_status == 'failure':
+            status = 'FAILURE'
+        elif self.cprover_status == 'success':
+            status = 'SUCCESS'
+        else:
+            status = 'UNKNOWN'
+        return {'status': status, 'checks': self.checks, 'failed': self.failed, 'solver': self.solver,
+                'errors': self.errors}
+
+def parse_json_ui(text):
+    parser = JsonUiParser()
+    parser.feed(text)
+    return parser.summary()
+
+def summary_text(summary):
+    #one line for the 'output' field of a result, in place of CBMC's full output
+    parts = [summary['status']]
+    if summary['failed']:
+        first = summary['failed'][0]
+        parts.append(f"{first['property']} ({first['description']}, line {first['line']}, "
+                     f"trace {first['trace_length']} steps)")
+    checks = ", ".join(f"{count} {status.lower()}" for status, count in sorted(summary['checks'].items()))
+    if checks:
+        parts.append(f"checks: {checks}")
+    if summary['solver']:
+        parts.append(", ".join(f"{name} {value}" for name, value in sorted(summary['solver'].items())))
+    parts.extend(summary['errors'])
+    return "; ".join(parts)
+
+def text_outcome(stdout, stderr):
+    #(verdict, failed check descriptions, output to keep) from CBMC's plain text output
+    output = stdout + '\n' + stderr
+    if "VERIFICATION SUCCESSFUL" in output:
+        verdict = 'SUCCESS'
+    elif "VERIFICATION FAILED" in output:
+        verdict = 'FAILURE'
+    else:
+        verdict = 'UNKNOWN'
+    failures = [line.strip() for line in output.splitlines() if line.rstrip().endswith(': FAILURE')]
+    return verdict, failures, output
+
+def json_outcome(summary, stderr):
+    #same as text_outcome for a JsonUiParser summary, the output kept is the summary line
+    return (summary['status'], [check['description'] or check['property'] or '' for check in summary['failed']],
+            summary_text(summary))
+
+def solver_stats(summaries):
+    #one compact record per benchmark from the summaries of its CBMC jobs, None when there are none
+    summaries = [summary for summary in summaries if summary]
+    if not summaries:
+        return None
+    stats = {'variables': 0, 'clauses': 0, 'sat_time': 0.0, 'checks': 0, 'failed_check': None, 'trace_length': None}
+    for summary in summaries:
+        for name in ('variables', 'clauses', 'sat_time'):
+            stats[name] += summary['solver'].get(name, 0)
+        stats['checks'] += sum(summary['checks'].values())
+        #a real counterexample says more than a bound that was too small
+        failed = sorted(summary['failed'], key=lambda check: 'unwinding assertion' in (check['description'] or ''))
+        if failed and stats['failed_check'] is None:
+            stats['failed_check'] = failed[0]['property']
+            stats['trace_length'] = failed[0]['trace_length']
+    return stats
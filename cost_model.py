@@ -0,0 +1,135 @@
+import os
+import re
+import math
+import numpy as np
+from journal import open_journal, journal_append, read_journal
+from benchmark_index import benchmark_entry
+from result_cache import file_bytes
+
+#predicts how long a verifier takes on a benchmark from its source and properties, trained on earlier runs
+#every finished (not cached) benchmark is appended to a runtime history, the next run fits one ridge
+#regression on log(seconds) per tool and uses it to order the jobs, fit them into a time budget and
+#give each job a timeout that leaves room for the model's own error
+history_path = os.path.join(os.getcwd(), ".runtime_history.jsonl")
+feature_version = 1
+min_history = 20 #runs of a tool needed before its model is trusted, below that the size heuristic is used
+ridge = 1.0
+min_job_timeout = 10 #seconds, adaptive timeouts never go below this
+property_kinds = ['unreach-call', 'no-overflow', 'valid-mem', 'termination', 'coverage']
+schedules = ['longest', 'shortest', 'budget']
+
+_loops = re.compile(r'\b(?:for|while|do)\b')
+_floats = re.compile(r'\b(?:float|double)\b|\b\d+\.\d*(?:[eE][-+]?\d+)?[fFlL]?')
+_pointers = re.compile(r'->|\b(?:malloc|calloc|realloc|free)\b|[A-Za-z_]\w*\s*\*+\s*[A-Za-z_]\w*\s*[=;,)\[]|&[A-Za-z_]')
+
+def source_features(source):
+    text = source.decode('utf-8', errors='replace')
+    return {
+        'bytes': len(source),
+        'lines': text.count('\n'),
+        'loops': len(_loops.findall(text)),
+        'float_ops': len(_floats.findall(text)),
+        'pointer_ops': len(_pointers.findall(text))
+    }
+
+def benchmark_features(yml_path):
+    entry = benchmark_entry(yml_path)
+    features = source_features(file_bytes(entry['input_file']) if entry['input_file'] else b'')
+    property_files = [prop['property_file'] or '' for prop in entry['properties']]
+    features['properties'] = len(property_files)
+    for kind in property_kinds:
+        features[kind] = int(any(kind in property_file for property_file in property_files))
+    return features
+
+def feature_vector(features):
+    #counts on a log scale, the solver time grows far slower than linearly with them
+    return [1.0] + [math.log1p(features.get(name, 0)) for name in ('bytes', 'lines', 'loops', 'float_ops',
+                                                                   'pointer_ops')] + \
+           [float(features.get('properties', 0))] + [float(features.get(kind, 0)) for kind in property_kinds]
+
+def open_history(path=None):
+    return open_journal(path or history_path)
+
+def record_run(history, yml_path, tool, features, seconds, timed_out):
+    journal_append(history, {
+        'yml_path': os.path.normpath(yml_path),
+        'sha256': benchmark_entry(yml_path)['input_sha256'],
+        'tool': tool,
+        'version': feature_version,
+        'features': features,
+        'time': seconds,
+        'timed_out': timed_out
+    })
+
+def fit_models(path=None):
+    #{tool: {'weights', 'sigma', 'samples'}} for every tool with at least min_history distinct runs
+    #the latest run of each source wins, a timeout only says the time was at least the timeout, it's kept as is
+    latest = {}
+    for record in read_journal(path or history_path):
+        if record.get('version') == feature_version:
+            latest[(record['tool'], record.get('sha256') or record['yml_path'])] = record
+    by_tool = {}
+    for (tool, _), record in latest.items():
+        by_tool.setdefault(tool, []).append(record)
+    models = {}
+    for tool, records in by_tool.items():
+        if len(records) < min_history:
+            continue
+        x = np.array([feature_vector(record['features']) for record in records])
+        y = np.log(np.maximum([record['time'] for record in records], 1e-3))
+        penalty = ridge * np.eye(x.shape[1])
+        penalty[0, 0] = 0.0 #the intercept isn't shrunk
+        weights = np.linalg.solve(x.T @ x + penalty, x.T @ y)
+        residuals = y - x @ weights
+        models[tool] = {'weights': weights.tolist(), 'sigma': float(np.std(residuals)), 'samples': len(records)}
+    return models
+
+def predict(models, tool, features):
+    #predicted seconds, None when there is no model for the tool yet
+    model = models.get(tool)
+    if model is None:
+        return None
+    return math.exp(float(np.dot(model['weights'], feature_vector(features))))
+
+def job_timeout(models, tool, predicted, default):
+    #generous enough that a benchmark the model underestimates by two standard deviations still finishes
+    if predicted is None or tool not in models:
+        return default
+    return min(default, max(min_job_timeout, predicted * math.exp(2 * models[tool]['sigma'])))
+
+def schedule_jobs(yml_files, predicted, policy='longest', budget=None, workers=1):
+    #returns (ordered jobs, jobs left out), predicted maps yml path -> seconds
+    #longest - longest first, so a slow file doesn't start last and hold up the whole sweep
+    #shortest - shortest first, for quick feedback on as many benchmarks as possible
+    #budget - as many benchmarks as fit in budget seconds of wall time on the workers, cheapest first,
+    #         then run longest first so they pack tightly
+    if policy == 'shortest':
+        return sorted(yml_files, key=lambda yml_path: predicted[yml_path]), []
+    if policy == 'budget' and budget is not None:
+        chosen = []
+        planned = 0.0
+        by_cost = sorted(yml_files, key=lambda yml_path: predicted[yml_path])
+        for yml_path in by_cost:
+            if (planned + predicted[yml_path]) / max(1, workers) > budget:
+                break
+            chosen.append(yml_path)
+            planned += predicted[yml_path]
+        left_out = by_cost[len(chosen):]
+        return sorted(chosen, key=lambda yml_path: predicted[yml_path], reverse=True), left_out
+    return sorted(yml_files, key=lambda yml_path: predicted[yml_path], reverse=True), []
+
+def prediction_stats(pairs):
+    #(count, median ratio error, share within 2x, rank correlation) for (predicted, actual) pairs
+    pairs = [(p, a) for p, a in pairs if p is not None and a is not None and p > 0 and a > 0]
+    if not pairs:
+        return None
+    predicted = np.array([p for p, _ in pairs])
+    actual = np.array([a for _, a in pairs])
+    log_error = np.abs(np.log(predicted / actual))
+    correlation = None
+    if len(pairs) > 2:
+        ranks_p = np.argsort(np.argsort(predicted))
+        ranks_a = np.argsort(np.argsort(actual))
+        if np.std(ranks_p) > 0 and np.std(ranks_a) > 0:
+            correlation = float(np.corrcoef(ranks_p, ranks_a)[0, 1])
+    return len(pairs), float(np.exp(np.median(log_error))), float(np.mean(log_error <= math.log(2))), correlation
@@ -0,0 +1,79 @@
+import os
+import shutil
+import subprocess
+import threading
+from functools import lru_cache
+from result_cache import cache_key, cache_path, tool_version
+
+#CBMC's front end (parsing, type checking, conversion to a GOTO program) is the same for every run on a source,
+#whatever checks or unwind bound the run uses, so each source is compiled once with goto-cc and every later
+#CBMC run starts from the stored goto-binary
+#the binaries sit in the result cache next to the verdicts, keyed by the source, goto-cc's version and the
+#flags that change the front end's output, and are evicted with them
+frontend_timeout = 120 #seconds for one goto-cc run
+#flags with a value that goto-cc has to see, the others (checks, unwinding, output) only matter to CBMC
+frontend_value_flags = ('-D', '-I', '--function', '--arch', '--os')
+frontend_switches = ('--16', '--32', '--64', '--LP64', '--ILP64', '--LLP64', '--ILP32', '--LP32',
+                     '--little-endian', '--big-endian')
+
+def frontend_flags(flags):
+    #the part of a CBMC command line that goto-cc needs to build the same program CBMC would
+    selected = []
+    i = 0
+    while i < len(flags):
+        flag = flags[i]
+        if flag in frontend_value_flags and i + 1 < len(flags):
+            selected.extend(flags[i:i + 2])
+            i += 2
+            continue
+        if flag in frontend_switches or flag.startswith(('-D', '-I')):
+            selected.append(flag)
+        i += 1
+    return selected
+
+@lru_cache(maxsize=None)
+def goto_cc_path():
+    path = shutil.which('goto-cc')
+    if path is None:
+        print("goto-cc not found, CBMC will parse every source itself")
+    return path
+
+def goto_binary(c_file, flags, source):
+    #path of the goto-binary for c_file, compiled now when it isn't stored yet
+    #None when goto-cc isn't installed or can't compile the source, CBMC is then run on the source as before
+    goto_cc = goto_cc_path()
+    if goto_cc is None:
+        return None
+    selected = frontend_flags(flags)
+    key = cache_key('goto-cc', tool_version(goto_cc), selected, source)
+    path = cache_path(key, '.gb')
+    if os.path.exists(path):
+        #touching the binary marks it as recently used for eviction
+        try:
+            os.utime(path, None)
+            return path
+        except OSError:
+            pass
+    failed_path = cache_path(key, '.failed')
+    if os.path.exists(failed_path):
+        return None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    #compiled under a temporary name and renamed, so parallel workers never start CBMC on half a binary
+    #the name is per thread as well, NN+CBMC.py compiles from several threads of one process
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        result = subprocess.run([goto_cc, c_file, '-o', tmp_path] + selected, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True, timeout=frontend_timeout)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"goto-cc failed on {c_file}: {e}")
+        return None
+    if result.returncode != 0 or not os.path.exists(tmp_path):
+        #remembered so the source isn't compiled again on every run, CBMC reports the same errors itself
+        print(f"goto-cc could not compile {c_file}, running CBMC on the source")
+        with open(failed_path, 'w') as f:
+            f.write(result.stdout)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, path)
+    return path
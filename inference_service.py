@@ -0,0 +1,220 @@
+import os
+import json
+import hashlib
+import socket
+import socketserver
+import tempfile
+import threading
+import argparse
+from nn_inference import encode_batched, encode_windowed, score_encoded, batch_size as default_batch_size
+from backends import load_backend, backend_tag, backends
+
+#model scoring for NN.py, NN+CBMC.py and calibrate.py, either in this process (the model is only loaded once
+#something actually needs scoring) or through a long-lived daemon that keeps the model warm between runs
+#the daemon listens on a Unix socket and speaks one JSON object per line:
+#  {"op": "hello"} -> {"model", "backend", "commit"}
+#  {"op": "score", "codes": [...], "window_mode", "window_aggregate", "max_windows", "batch_size"} -> {"results": [...]}
+#  {"op": "shutdown"} -> {"ok": true}
+#start it with `python inference_service.py`, the scripts use it automatically when it serves the same model
+socket_path = os.environ.get('NN_DAEMON_SOCKET', os.path.join(tempfile.gettempdir(), f"vulberta-{os.getuid()}.sock"))
+
+class LocalScorer:
+    def __init__(self, model_name, backend='pytorch', window_mode=False, window_aggregate='max', max_windows=16,
+                 batch_size=default_batch_size):
+        self.model_name = model_name
+        self.backend = backend
+        self.window_mode = window_mode
+        self.window_aggregate = window_aggregate
+        self.max_windows = max_windows
+        self.batch_size = batch_size
+        self.tokenizer = None
+        self.model = None
+        self.commit = None
+        self.vocab_digest = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        #the tokenize and infer stages may both get here first, the lock makes sure it happens once
+        with self._lock:
+            if self.model is None:
+                print(f"Loading {self.model_name} ({self.backend})...")
+                self.tokenizer, self.model = load_backend(self.backend, self.model_name)
+                self.commit = getattr(self.model.config, '_commit_hash', None)
+
+    def version(self):
+        #the cache key part for the model and settings, only reads the model config, not the weights
+        if self.commit is None and self.model is None:
+            from transformers import AutoConfig
+            self.commit = getattr(AutoConfig.from_pretrained(self.model_name), '_commit_hash', None)
+        return ([self.model_name, self.commit, self.window_mode, self.window_aggregate, self.max_windows]
+                + backend_tag(self.backend))
+
+    def encoding_key(self):
+        #equal for models whose encodings are interchangeable (same tokenizer and windowing), see cascade.py
+        self.load()
+        if self.vocab_digest is None:
+            vocab = json.dumps(sorted(self.tokenizer.get_vocab().items())).encode('utf-8')
+            self.vocab_digest = hashlib.sha256(vocab).hexdigest()[:16]
+        return (type(self.tokenizer).__name__, self.vocab_digest, self.window_mode, self.max_windows)
+
+    def encode(self, codes):
+        if not codes:
+            return None
+        self.load()
+        if self.window_mode:
+            return encode_windowed(codes, self.tokenizer, limit=self.max_windows)
+        return encode_batched(codes, self.tokenizer)
+
+    def score(self, encoded):
+        if encoded is None:
+            return []
+        self.load()
+        return score_encoded(encoded, self.tokenizer, self.model, self.window_aggregate, batch_size=self.batch_size)
+
+class DaemonScorer:
+    #same interface as LocalScorer, encoding is left to the daemon so the sources are sent as they are
+    def __init__(self, path, hello, window_mode=False, window_aggregate='max', max_windows=16,
+                 batch_size=default_batch_size):
+        self.path = path
+        self.model_name = hello['model']
+        self.backend = hello['backend']
+        self.commit = hello['commit']
+        self.window_mode = window_mode
+        self.window_aggregate = window_aggregate
+        self.max_windows = max_windows
+        self.batch_size = batch_size
+
+    def version(self):
+        return ([self.model_name, self.commit, self.window_mode, self.window_aggregate, self.max_windows]
+                + backend_tag(self.backend))
+
+    def encode(self, codes):
+        return list(codes)
+
+    def score(self, codes):
+        if not codes:
+            return []
+        reply = request(self.path, {'op': 'score', 'codes': codes, 'window_mode': self.window_mode,
+                                    'window_aggregate': self.window_aggregate, 'max_windows': self.max_windows,
+                                    'batch_size': self.batch_size})
+        return reply['results']
+
+def request(path, message, timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        with sock.makefile('rwb') as stream:
+            stream.write(json.dumps(message).encode() + b'\n')
+            stream.flush()
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("inference daemon closed the connection")
+    reply = json.loads(line)
+    if 'error' in reply:
+        raise RuntimeError(f"inference daemon: {reply['error']}")
+    return reply
+
+def connect_scorer(model_name, backend='pytorch', window_mode=False, window_aggregate='max', max_windows=16,
+                   batch_size=default_batch_size, path=None):
+    #the daemon when one is running with the same model and backend, otherwise a lazily loaded local model
+    path = path or socket_path
+    if os.path.exists(path):
+        try:
+            hello = request(path, {'op': 'hello'}, timeout=2)
+            if hello['model'] == model_name and hello['backend'] == backend:
+                print(f"Using the inference daemon at {path}")
+                return DaemonScorer(path, hello, window_mode, window_aggregate, max_windows, batch_size)
+            print(f"Inference daemon at {path} serves {hello['model']} ({hello['backend']}), scoring locally")
+        except (OSError, ValueError, KeyError, RuntimeError):
+            pass
+    return LocalScorer(model_name, backend, window_mode, window_aggregate, max_windows, batch_size)
+
+class ScoreHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = self.server.dispatch(json.loads(line))
+            except Exception as e:
+                reply = {'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+            self.wfile.flush()
+            if self.server.stopping:
+                #only once the reply is out, the process exits as soon as serve_forever returns
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+class InferenceDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, model_name, backend):
+        self.model_name = model_name
+        self.backend = backend
+        self.tokenizer, self.model = load_backend(backend, model_name)
+        #one forward pass at a time, concurrent clients queue up here
+        self.model_lock = threading.Lock()
+        self.stopping = False
+        super().__init__(path, ScoreHandler)
+
+    def dispatch(self, message):
+        op = message.get('op')
+        if op == 'hello':
+            return {'model': self.model_name, 'backend': self.backend,
+                    'commit': getattr(self.model.config, '_commit_hash', None)}
+        if op == 'score':
+            codes = message['codes']
+            if message.get('window_mode'):
+                encoded = encode_windowed(codes, self.tokenizer, limit=message.get('max_windows', 16))
+            else:
+                encoded = encode_batched(codes, self.tokenizer)
+            with self.model_lock:
+                results = score_encoded(encoded, self.tokenizer, self.model, message.get('window_aggregate', 'max'),
+                                        batch_size=message.get('batch_size', default_batch_size))
+            return {'results': results}
+        if op == 'shutdown':
+            self.stopping = True
+            return {'ok': True}
+        raise ValueError(f"unknown op {op!r}")
+
+def serve(path, model_name, backend):
+    if os.path.exists(path):
+        try:
+            request(path, {'op': 'hello'}, timeout=2)
+            print(f"An inference daemon is already listening on {path}")
+            exit(1)
+        except (OSError, ValueError, RuntimeError):
+            #left behind by a daemon that didn't shut down cleanly
+            os.remove(path)
+    server = InferenceDaemon(path, model_name, backend)
+    os.chmod(path, 0o600)
+    print(f"Serving {model_name} ({backend}) on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Keep the vulnerability model loaded and serve scores over a Unix socket")
+    parser.add_argument('--model', default="claudios/VulBERTa-MLP-Devign")
+    parser.add_argument('--backend', default='pytorch', choices=backends)
+    parser.add_argument('--socket', default=socket_path, help="socket path (or set NN_DAEMON_SOCKET)")
+    parser.add_argument('--stop', action='store_true', help="stop the daemon listening on the socket")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.stop:
+        try:
+            request(args.socket, {'op': 'shutdown'}, timeout=5)
+            print(f"Stopped the inference daemon on {args.socket}")
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"No inference daemon on {args.socket}: {e}")
+            exit(1)
+        return
+    serve(args.socket, args.model, args.backend)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#splits a benchmark into one CBMC job per property, each with only that property's flags, and merges the
+#properties that end up with exactly the same flags into one job, so no identical solver run happens twice
+#the job verdicts are mapped back to every property, giving per-property verdicts instead of one blended one
+#user assertions (the reach_error() calls) belong to unreach-call, every other job runs with --no-assertions
+#so it only fails on its own property's checks, the unwinding assertions aren't user assertions and stay on
+
+def property_pattern(prop_file, property_map):
+    for pattern in property_map:
+        if pattern in prop_file:
+            return pattern
+    return None
+
+def plan_jobs(properties, base_flags, property_map, unsupported=('coverage',), assertion_properties=('unreach-call',)):
+    #returns (jobs, assignment), jobs are {'flags', 'properties'} with the indices of the properties they cover,
+    #assignment[i] is the job index for property i, or None when the property isn't run
+    #only properties with an expected verdict are planned, unless none of them has one
+    wanted = [i for i, prop in enumerate(properties) if prop.get('expected_verdict') is not None]
+    if not wanted:
+        wanted = list(range(len(properties)))
+    jobs = []
+    by_flags = {}
+    assignment = [None] * len(properties)
+    for i in wanted:
+        pattern = property_pattern(properties[i].get('property_file') or '', property_map)
+        if pattern in unsupported:
+            continue
+        flags = list(base_flags)
+        for flag in property_map.get(pattern, []):
+            if flag not in flags:
+                flags.append(flag)
+        if pattern not in assertion_properties and '--no-assertions' not in flags:
+            flags.append('--no-assertions')
+        key = tuple(flags)
+        if key not in by_flags:
+            by_flags[key] = len(jobs)
+            jobs.append({'flags': flags, 'properties': []})
+        jobs[by_flags[key]]['properties'].append(i)
+        assignment[i] = by_flags[key]
+    return jobs, assignment
+
+def property_match(expected, verdict):
+    #True/False like the benchmark level match, or TIMEOUT/MEMOUT/UNKNOWN when there's nothing to compare
+    if verdict in ('TIMEOUT', 'MEMOUT'):
+        return verdict
+    if expected is None or verdict not in ('SUCCESS', 'FAILURE'):
+        return 'UNKNOWN'
+    return (verdict == 'SUCCESS') == expected
+
+def map_job_verdicts(properties, assignment, job_verdicts, normalize):
+    #one {'property', 'expected', 'verdict', 'match'} per property, normalize turns a raw expected_verdict into a bool
+    results = []
+    for prop, job in zip(properties, assignment):
+        raw_verdict = prop.get('expected_verdict')
+        expected = normalize(raw_verdict) if raw_verdict is not None else None
+        verdict = job_verdicts[job] if job is not None and job < len(job_verdicts) else 'SKIPPED'
+        results.append({
+            'property': prop.get('property_file') or 'unknown',
+            'expected': raw_verdict,
+            'verdict': verdict,
+            'match': property_match(expected, verdict)
+        })
+    return results
+
+def overall_verdict(verdicts):
+    #a counterexample for any property makes the benchmark FAILURE, it's only SUCCESS if every job proved it
+    run = [verdict for verdict in verdicts if verdict != 'SKIPPED']
+    if not run:
+        return 'UNKNOWN'
+    for verdict in ('CANCELLED', 'FAILURE', 'TIMEOUT', 'MEMOUT', 'UNKNOWN'):
+        if verdict in run:
+            return verdict
+    return 'SUCCESS'
+
+def overall_match(results):
+    #the benchmark matches when every property with an expected verdict matches
+    matches = [r['match'] for r in results if r['expected'] is not None]
+    if not matches:
+        return 'UNKNOWN'
+    if any(match is False for match in matches):
+        return False
+    for label in ('TIMEOUT', 'MEMOUT', 'UNKNOWN'):
+        if label in matches:
+            return label
+    return True
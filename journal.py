@@ -0,0 +1,63 @@
+import os
+import json
+
+#append-only JSONL journal of finished benchmarks, so a killed sweep can be resumed or reported on
+#every record is flushed and synced as soon as it's written, a torn last line from a crash is skipped on read
+#and cut off when the journal is opened again, so the next record doesn't end up glued onto it
+
+def drop_torn_tail(path):
+    #truncates whatever follows the last newline, only a record a crash interrupted can be there
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            print(f"Warning: dropping an unfinished record at the end of {path}")
+            f.truncate(position)
+
+def open_journal(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    drop_torn_tail(path)
+    return open(path, 'a')
+
+def journal_append(journal, record):
+    journal.write(json.dumps(record, default=str) + '\n')
+    journal.flush()
+    os.fsync(journal.fileno())
+
+def read_journal(path):
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print(f"Warning: skipping unreadable journal line {line_number} in {path}")
+    return records
+
+def latest_by_key(records, key='yml_path'):
+    #a benchmark can show up more than once after a resume, the last record wins
+    latest = {}
+    for record in records:
+        if key in record:
+            latest[record[key]] = record
+    return latest
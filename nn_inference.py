@@ -0,0 +1,191 @@
+import math
+import time
+
+#shared batched inference for NN.py and NN+CBMC.py
+max_length = 512
+batch_size = 32
+#upper bound on padded tokens in one forward pass, keeps batches of long files from blowing up memory
+max_batch_tokens = 8192
+#sliding window settings for files longer than max_length
+window_overlap = 128
+max_windows = 16
+aggregations = ['max', 'mean', 'attention']
+
+def make_batches(lengths, batch_size=batch_size, max_batch_tokens=max_batch_tokens):
+    #sort by token length so every batch holds files of similar size and needs little padding
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    for i in order:
+        #the longest file in a sorted batch is the last one added
+        if current and (len(current) >= batch_size or lengths[i] * (len(current) + 1) > max_batch_tokens):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+def score_encodings(model, batch):
+    #torch is imported on first use, so scripts that only hit the cache or a daemon never pay for it
+    import torch
+    with torch.no_grad():
+        outputs = model(**batch)
+        logits = outputs.logits
+        probabilities = torch.softmax(logits, dim=1)
+    return probabilities
+
+def score_features(features, tokenizer, model, batch_size=batch_size, max_batch_tokens=max_batch_tokens):
+    #features are already tokenized inputs, returns (vulnerability_score, time share) per feature
+    lengths = [len(feature['input_ids']) for feature in features]
+    scores = [None] * len(features)
+    for batch_indices in make_batches(lengths, batch_size, max_batch_tokens):
+        start_time = time.time()
+        #pad only up to the longest input in this batch instead of always to 512
+        batch = tokenizer.pad([features[i] for i in batch_indices], padding='longest', return_tensors="pt")
+        probabilities = score_encodings(model, batch)
+        per_item_time = (time.time() - start_time) / len(batch_indices)
+        for row, i in enumerate(batch_indices):
+            scores[i] = (probabilities[row][1].item(), per_item_time)
+    return scores
+
+def encode_batched(codes, tokenizer):
+    #the tokenizer half of run_model_batched, kept apart so a pipeline can tokenize ahead of the model
+    #returns the features plus, per file, the tokenize time and which features belong to it
+    if not codes:
+        return {'features': [], 'owners': [], 'times': [], 'windows': None}
+    tokenize_start = time.time()
+    encodings = tokenizer(list(codes), truncation=True, max_length=max_length)
+    tokenize_time = (time.time() - tokenize_start) / len(codes)
+    features = [{key: encodings[key][i] for key in encodings.keys()} for i in range(len(codes))]
+    return {'features': features, 'owners': list(range(len(codes))), 'times': [tokenize_time] * len(codes),
+            'windows': None}
+
+def score_encoded(encoded, tokenizer, model, aggregate='max', batch_size=batch_size,
+                  max_batch_tokens=max_batch_tokens):
+    #the model half: one {'vulnerability_score', 'confidence', 'time', 'phases'} dict per file, plus 'windows'
+    #when windowed, phases splits time into tokenize and inference
+    times = list(encoded['times'])
+    window_scores = [[] for _ in times]
+    for owner, (vulnerability_score, inference_time) in zip(encoded['owners'], score_features(
+            encoded['features'], tokenizer, model, batch_size, max_batch_tokens)):
+        window_scores[owner].append(vulnerability_score)
+        times[owner] += inference_time
+    results = []
+    for i in range(len(times)):
+        vulnerability_score = aggregate_scores(window_scores[i], aggregate)
+        result = {
+            'vulnerability_score': vulnerability_score,
+            'confidence': max(vulnerability_score, 1 - vulnerability_score),
+            'time': times[i],
+            'phases': {'tokenize': encoded['times'][i], 'inference': times[i] - encoded['times'][i]}
+        }
+        if encoded['windows'] is not None:
+            result['windows'] = encoded['windows'][i]
+        results.append(result)
+    return results
+
+def select_encoded(encoded, indices):
+    #the encoding of a subset of the files, in the order of indices, so a later model with the same tokenizer
+    #doesn't tokenize them again, their tokenize time was already counted
+    position = {index: k for k, index in enumerate(indices)}
+    keep = [j for j, owner in enumerate(encoded['owners']) if owner in position]
+    return {'features': [encoded['features'][j] for j in keep],
+            'owners': [position[encoded['owners'][j]] for j in keep],
+            'times': [0.0] * len(indices),
+            'windows': [encoded['windows'][i] for i in indices] if encoded['windows'] is not None else None}
+
+def run_model_batched(codes, tokenizer, model, batch_size=batch_size, max_batch_tokens=max_batch_tokens):
+    #returns one {'vulnerability_score', 'confidence', 'time'} dict per input, in input order
+    #time is the batch time split evenly over the files in the batch
+    return score_encoded(encode_batched(codes, tokenizer), tokenizer, model, batch_size=batch_size,
+                         max_batch_tokens=max_batch_tokens)
+
+def function_chunks(code):
+    #split the source after every line that brings the brace depth back to 0, i.e. at the end of
+    #each top level function or declaration. braces in strings and comments are not special cased
+    chunks = []
+    current = []
+    depth = 0
+    for line in code.splitlines(keepends=True):
+        current.append(line)
+        depth = max(0, depth + line.count('{') - line.count('}'))
+        if depth == 0 and '}' in line:
+            chunks.append(''.join(current))
+            current = []
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+def split_windows(code, tokenizer, overlap=window_overlap, limit=max_windows):
+    #returns token id windows that each fit the model, cut at function boundaries where possible
+    budget = max_length - tokenizer.num_special_tokens_to_add()
+    chunks = function_chunks(code)
+    if not chunks:
+        return [[]]
+    chunk_ids = tokenizer(chunks, add_special_tokens=False)['input_ids']
+    pieces = []
+    for ids in chunk_ids:
+        if len(ids) <= budget:
+            pieces.append(ids)
+        else:
+            #a single function longer than the model limit gets plain overlapping token windows
+            step = max(1, budget - overlap)
+            for start in range(0, len(ids), step):
+                pieces.append(ids[start:start + budget])
+                if start + budget >= len(ids):
+                    break
+    windows = []
+    current = []
+    for piece in pieces:
+        if current and len(current) + len(piece) > budget:
+            windows.append(current)
+            #carry the tail of the previous window over so code near a cut is seen in context
+            carry = current[-overlap:] if overlap > 0 else []
+            current = carry if len(carry) + len(piece) <= budget else []
+        current = current + piece
+    if current or not windows:
+        windows.append(current)
+    if limit and len(windows) > limit:
+        #keep evenly spaced windows so the whole file is still covered
+        step = (len(windows) - 1) / (limit - 1) if limit > 1 else 0
+        windows = [windows[round(i * step)] for i in range(limit)]
+    return windows
+
+def aggregate_scores(scores, method='max'):
+    if method == 'max':
+        return max(scores)
+    if method == 'mean':
+        return sum(scores) / len(scores)
+    if method == 'attention':
+        #softmax over the windows' log-odds, so confident windows dominate without ignoring the rest
+        eps = 1e-6
+        logits = [math.log((s + eps) / (1 - s + eps)) for s in scores]
+        top = max(logits)
+        weights = [math.exp(l - top) for l in logits]
+        return sum(w * s for w, s in zip(weights, scores)) / sum(weights)
+    raise ValueError(f"Unknown aggregation: {method}")
+
+def encode_windowed(codes, tokenizer, overlap=window_overlap, limit=max_windows):
+    #the tokenizer half of run_model_windowed, same shape as encode_batched
+    features = []
+    owners = []
+    file_times = []
+    window_counts = []
+    for i, code in enumerate(codes):
+        start_time = time.time()
+        windows = split_windows(code, tokenizer, overlap, limit)
+        for ids in windows:
+            input_ids = tokenizer.build_inputs_with_special_tokens(ids)
+            features.append({'input_ids': input_ids, 'attention_mask': [1] * len(input_ids)})
+            owners.append(i)
+        file_times.append(time.time() - start_time)
+        window_counts.append(len(windows))
+    return {'features': features, 'owners': owners, 'times': file_times, 'windows': window_counts}
+
+def run_model_windowed(codes, tokenizer, model, aggregate='max', overlap=window_overlap, limit=max_windows,
+                       batch_size=batch_size, max_batch_tokens=max_batch_tokens):
+    #like run_model_batched, but long files are scored as several windows that are combined into one score
+    #windows from all files share the same batches, time is the per-file tokenize time plus its windows' share
+    return score_encoded(encode_windowed(codes, tokenizer, overlap, limit), tokenizer, model, aggregate,
+                         batch_size, max_batch_tokens)
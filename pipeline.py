@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import queue
+import functools
+from itertools import islice
+from result_cache import cache_key, cached_lookup, cached_fill
+from profiling import timed, add_phases
+from verifier_process import run_command
+
+#streaming stages for NN.py and NN+CBMC.py: discover -> load -> tokenize -> infer -> verify -> emit
+#every stage is a generator, the tokenize and infer stages run in their own threads and hand over through
+#bounded queues, so at most a few chunks of sources are in memory no matter how many benchmarks there are
+chunk_size = 128 #files tokenized and scored together, large enough to keep the length-sorted batches full
+queue_size = 2 #chunks a stage may work ahead of the next one
+
+_finished = object()
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+def threaded(items, maxsize=queue_size):
+    #runs the generator in a background thread, at most maxsize items ahead of whoever consumes it
+    handoff = queue.Queue(maxsize)
+    def produce():
+        try:
+            for item in items:
+                handoff.put(item)
+        except BaseException as e:
+            handoff.put(_StageError(e))
+            return
+        handoff.put(_finished)
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = handoff.get()
+        if item is _finished:
+            return
+        if isinstance(item, _StageError):
+            raise item.error
+        yield item
+
+async def async_iter(items):
+    #hands a blocking generator to an event loop, every next() runs on a worker thread
+    items = iter(items)
+    while True:
+        item = await asyncio.to_thread(next, items, _finished)
+        if item is _finished:
+            return
+        yield item
+
+async def async_run(cmd, timeout, usage=None, stdout_sink=None, executor=None):
+    #asyncio counterpart of unwinding.simple_run, same (returncode, stdout, stderr, status) result
+    #the run goes through verifier_process.run_command on a worker thread, which reaps the process with wait4,
+    #so usage also gets the 'cpu' seconds and peak RSS of this process alone, the event loop can't report those
+    #stdout_sink, when given, gets stdout chunk by chunk as it is written instead, stdout then comes back empty
+    #executor is the pool the blocking run waits on, the loop's default one (shared with async_iter) when None
+    run = functools.partial(run_command, cmd, timeout, usage=usage, stdout_sink=stdout_sink)
+    returncode, stdout, stderr, status = await asyncio.get_running_loop().run_in_executor(executor, run)
+    return returncode if status == 'done' else None, stdout, stderr, status
+
+def chunked(items, size=chunk_size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+def load_sources(entries):
+    #pairs each indexed .yml with the .c file of the same name, the source is only read when it's needed
+    #every pair carries a profiling phases dict that the later stages add their time to
+    for entry in entries:
+        if entry['c_path'] is None:
+            continue
+        phases = {}
+        with timed(phases, 'file_read'):
+            with open(entry['c_path'], 'r') as f:
+                c_code = f.read()
+        yield {
+            'name': entry['name'],
+            'c_code': c_code,
+            'properties': entry['properties'],
+            'c_path': entry['c_path'],
+            'yml_path': entry['yml_path'],
+            'phases': phases
+        }
+
+def tokenize_chunks(chunks, scorer, use_cache=True):
+    #looks each chunk up in the result cache and only tokenizes the sources that aren't in it
+    version = scorer.version()
+    for chunk in chunks:
+        codes = [pair['c_code'] for pair in chunk]
+        keys = [cache_key('model', version, code) for code in codes]
+        results, missing = cached_lookup(keys, use_cache)
+        encoded = scorer.encode([codes[i] for i in missing])
+        yield chunk, keys, results, missing, encoded
+
+def infer_chunks(tokenized, scorer, use_cache=True):
+    #yields each chunk as a list of (pair, nn_result), the source text is dropped once it has been scored
+    for chunk, keys, results, missing, encoded in tokenized:
+        values = scorer.score(encoded)
+        #the timings belong to this run, they go to the pair instead of into the cache
+        for i, value in zip(missing, values):
+            add_phases(chunk[i]['phases'], value.pop('phases', None))
+        cached_fill(keys, results, missing, values, use_cache)
+        for pair in chunk:
+            del pair['c_code']
+        yield list(zip(chunk, results))
+
+def score_stream(entries, scorer, use_cache=True, size=chunk_size):
+    #the whole NN side of the pipeline, chunks of (pair, nn_result) come out while later files are still loading
+    #scorer is a LocalScorer or DaemonScorer from inference_service
+    #the loader reads at most one chunk of sources ahead
+    pairs = threaded(load_sources(entries), size)
+    tokenized = threaded(tokenize_chunks(chunked(pairs, size), scorer, use_cache))
+    return threaded(infer_chunks(tokenized, scorer, use_cache))
+
+def open_csv(path, headers):
+    #rows are appended as they are produced, so the CSV fills up while the run is still going
+    f = open(path, "w")
+    f.write(",".join(headers) + "\n")
+    f.flush()
+    return f
+
+def csv_append(f, row):
+    cleaned_row = [str(cell).replace(",", ";") for cell in row]
+    f.write(",".join(cleaned_row) + "\n")
+    f.flush()
+
+def read_csv_rows(path):
+    #the emitted rows back from disk, for the sorted table at the end of the report
+    with open(path, "r") as f:
+        next(f, None)
+        return [line.rstrip("\n").split(",") for line in f if line.strip()]
@@ -0,0 +1,59 @@
+import time
+from contextlib import contextmanager
+
+#per-benchmark timing broken down by phase, every result carries a 'phases' dict with seconds per phase plus
+#'peak_rss_kb', the largest resident set of any verifier process it ran
+#  yaml_parse   - loading the benchmark .yml (an index lookup when it's already indexed)
+#  file_read    - reading the source file
+#  frontend     - compiling the source to a goto-binary for CBMC (nothing when the binary is cached)
+#  tokenize     - turning the source into model inputs
+#  inference    - the model's forward passes
+#  spawn        - starting verifier processes
+#  solver_wall  - verifier processes running, wall-clock
+#  solver_cpu   - verifier processes running, user + system CPU of the process and its children
+#  output_parse - reading the verdict out of the verifier output
+phase_names = ['yaml_parse', 'file_read', 'frontend', 'tokenize', 'inference', 'spawn', 'solver_wall', 'solver_cpu',
+               'output_parse']
+
+@contextmanager
+def timed(phases, name):
+    #adds the time spent in the block to phases[name], phases may be None to not record anything
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - start_time
+
+def add_phases(total, phases):
+    #sums phase times into total, peak RSS is the maximum instead
+    for name, value in (phases or {}).items():
+        if name == 'peak_rss_kb':
+            total[name] = max(total.get(name, 0), value)
+        else:
+            total[name] = total.get(name, 0.0) + value
+    return total
+
+def add_usage(phases, usage):
+    #folds one run_command usage dict ('spawn', 'wall', 'cpu', 'peak_rss_kb') into a phases dict
+    if phases is None or not usage:
+        return
+    add_phases(phases, {'spawn': usage.get('spawn', 0.0), 'solver_wall': usage.get('wall', 0.0),
+                        'solver_cpu': usage.get('cpu', 0.0), 'peak_rss_kb': usage.get('peak_rss_kb', 0)})
+
+def phase_totals(records):
+    total = {}
+    for record in records:
+        add_phases(total, record.get('phases'))
+    return total
+
+def phase_lines(records):
+    #one summary line of where the time went, empty when no record has phase timings
+    total = phase_totals(records)
+    if not total:
+        return []
+    parts = [f"{name}: {total[name]:.2f}s" for name in phase_names if name in total]
+    lines = ["Time by phase: " + ", ".join(parts)]
+    if total.get('peak_rss_kb'):
+        lines.append(f"Peak verifier RSS: {total['peak_rss_kb'] / 1024:.1f} MB")
+    return lines
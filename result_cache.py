@@ -0,0 +1,160 @@
+import os
+import json
+import hashlib
+import subprocess
+import tempfile
+from functools import lru_cache
+
+#persistent on-disk cache for verifier and model verdicts, shared by CBMC.py, NN.py and NN+CBMC.py
+#entries are keyed by a hash of everything that can change a verdict (source, properties, tool, version, flags)
+#and evicted least recently used first once the cache grows past max_cache_bytes
+cache_dir = os.path.join(os.getcwd(), ".verification_cache")
+max_cache_bytes = 512 * 1024 * 1024
+cached_suffixes = ('.json', '.gb', '.failed') #verdicts, goto-binaries and failed compiles
+prune_every = 100
+stats = {'hits': 0, 'misses': 0}
+_puts_since_prune = 0
+
+def cache_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        elif isinstance(part, str):
+            data = part.encode('utf-8')
+        else:
+            data = json.dumps(part, sort_keys=True, default=str).encode('utf-8')
+        #length prefix so ('ab', 'c') and ('a', 'bc') hash differently
+        digest.update(str(len(data)).encode('ascii') + b':' + data)
+    return digest.hexdigest()
+
+def file_bytes(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return b''
+
+@lru_cache(maxsize=None)
+def tool_version(executable, flag='--version'):
+    #first line of `<tool> --version`, looked up once per process
+    try:
+        result = subprocess.run([executable, flag], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, timeout=30)
+        lines = result.stdout.strip().splitlines()
+        return lines[0] if lines else 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+def cache_path(key, suffix='.json'):
+    #where the entry for key lives, other suffixes hold files that aren't JSON (compiled programs)
+    return os.path.join(cache_dir, key[:2], key + suffix)
+
+def _entry_path(key):
+    return cache_path(key)
+
+def cache_get(key):
+    path = _entry_path(key)
+    try:
+        with open(path, 'r') as f:
+            value = json.load(f)
+    except (OSError, ValueError):
+        stats['misses'] += 1
+        return None
+    #touching the entry marks it as recently used for eviction
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    stats['hits'] += 1
+    return value
+
+def cache_put(key, value):
+    global _puts_since_prune
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    #write to a temp file and rename so parallel workers never see half written entries
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _puts_since_prune += 1
+    if _puts_since_prune >= prune_every:
+        prune_cache()
+
+def prune_cache(max_bytes=None):
+    #drop least recently used entries until the cache fits in max_bytes
+    global _puts_since_prune
+    _puts_since_prune = 0
+    if max_bytes is None:
+        max_bytes = max_cache_bytes
+    entries = []
+    total = 0
+    if not os.path.isdir(cache_dir):
+        return 0
+    for sub in os.scandir(cache_dir):
+        if not sub.is_dir():
+            continue
+        for entry in os.scandir(sub.path):
+            if not entry.name.endswith(cached_suffixes):
+                continue
+            try:
+                info = entry.stat()
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, entry.path))
+            total += info.st_size
+    removed = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def cached_lookup(keys, enabled=True):
+    #first half of cached_batch: returns (results with None for misses, missing indices)
+    results = [None] * len(keys)
+    missing = []
+    for i, key in enumerate(keys):
+        value = cache_get(key) if enabled else None
+        if value is None:
+            missing.append(i)
+        else:
+            value['cached'] = True
+            results[i] = value
+    return results, missing
+
+def cached_fill(keys, results, missing, values, enabled=True):
+    #second half: stores the computed values for the missing indices and fills them into results
+    for i, value in zip(missing, values):
+        if enabled:
+            cache_put(keys[i], value)
+        value['cached'] = False
+        results[i] = value
+    return results
+
+def cached_batch(keys, compute, enabled=True):
+    #looks every key up and calls compute(missing_indices) once for the misses,
+    #compute returns one result per missing index in the same order
+    results, missing = cached_lookup(keys, enabled)
+    if missing:
+        cached_fill(keys, results, missing, compute(missing), enabled)
+    return results
+
+def stats_line(hits=None, misses=None):
+    hits = stats['hits'] if hits is None else hits
+    misses = stats['misses'] if misses is None else misses
+    total = hits + misses
+    rate = hits / total if total else 0.0
+    return f"Cache: {hits} hits, {misses} misses ({rate:.2%} hit rate)"
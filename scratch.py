@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+#private scratch directories for verifier output, one per run so parallel runs never write into each other's
+#files, on tmpfs when there is one so the output CPAchecker writes for every benchmark never reaches the disk
+#only what a run's result asks to keep is copied out before the directory is removed
+tmpfs_roots = ['/dev/shm']
+
+def default_root():
+    for root in tmpfs_roots:
+        if os.path.isdir(root) and os.access(root, os.W_OK):
+            return root
+    return tempfile.gettempdir()
+
+@contextmanager
+def scratch_dir(prefix, root=None):
+    #yields a fresh directory under root (tmpfs by default), removed with everything in it afterwards
+    path = tempfile.mkdtemp(prefix=prefix, dir=root or default_root())
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def keep_files(source_dir, target_dir, predicate=None):
+    #copies the files under source_dir that predicate(relative path) accepts to target_dir, keeping their layout
+    #returns the number copied, target_dir is only created when there is something to copy
+    kept = 0
+    for directory, _, names in os.walk(source_dir):
+        for name in names:
+            relative = os.path.relpath(os.path.join(directory, name), source_dir)
+            if predicate is not None and not predicate(relative):
+                continue
+            destination = os.path.join(target_dir, relative)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(os.path.join(directory, name), destination)
+            kept += 1
+    return kept
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from statistics import median
+from journal import read_journal
+from cost_model import history_path
+
+#splits one sweep over several machines (or processes) that share nothing but a directory
+#every shard computes the same split on its own: without runtime history a benchmark goes to the shard given
+#by a stable hash of its path, so a benchmark stays on its shard when others are added or removed
+#with history the benchmarks are packed longest first onto the least loaded shard, and the first shard to
+#start writes that split to a plan file in the shared directory so later shards use it even if the history
+#has grown in the meantime
+plan_max_age = 6 * 3600 #seconds, an older plan file is from an earlier sweep and is planned again
+
+def parse_shard(text):
+    #"i/N" with 1 <= i <= N, as an argparse type
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {text} out of range, i must be between 1 and N")
+    return index, count
+
+def shard_key(path):
+    #the same on every machine as long as the benchmarks are found through the same relative directories
+    return os.path.normpath(path).replace(os.sep, '/')
+
+def stable_hash(path):
+    return int(hashlib.sha1(shard_key(path).encode('utf-8')).hexdigest()[:16], 16)
+
+def shard_suffix(shard):
+    #added to report and journal names so shards writing into one directory don't overwrite each other
+    return f"_shard{shard[0]}of{shard[1]}" if shard else ""
+
+def observed_runtimes(tool, path=None):
+    #latest measured seconds per benchmark for the tool, from the cost model's runtime history
+    runtimes = {}
+    for record in read_journal(path or history_path):
+        if record.get('tool') == tool:
+            runtimes[shard_key(record['yml_path'])] = record['time']
+    return runtimes
+
+def assign_shards(paths, count, runtimes=None):
+    #{shard key: shard index from 0}, benchmarks without a measured runtime are counted at the median one
+    keys = sorted({shard_key(path) for path in paths})
+    known = [runtimes[key] for key in keys if runtimes and key in runtimes]
+    if not known:
+        return {key: stable_hash(key) % count for key in keys}
+    default = median(known)
+    load = [0.0] * count
+    assignment = {}
+    for key in sorted(keys, key=lambda key: (-runtimes.get(key, default), stable_hash(key))):
+        shard = min(range(count), key=lambda i: (load[i], i))
+        assignment[key] = shard
+        load[shard] += runtimes.get(key, default)
+    return assignment
+
+def _load_plan(path, keys):
+    try:
+        if time.time() - os.path.getmtime(path) > plan_max_age:
+            return None
+        with open(path, 'r') as f:
+            plan = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return plan['assignment'] if sorted(plan['assignment']) == keys else None
+
+def shared_plan(paths, count, runtimes, plan_dir='.'):
+    #the assignment from the plan file for this benchmark set and shard count, written by whoever gets there first
+    keys = sorted({shard_key(path) for path in paths})
+    digest = hashlib.sha1(json.dumps([count, keys]).encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(plan_dir, f".shard_plan_{digest}.json")
+    assignment = _load_plan(path, keys)
+    if assignment is not None:
+        return assignment, path
+    assignment = assign_shards(paths, count, runtimes)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'count': count, 'created': time.time(), 'assignment': assignment}, f)
+    if os.path.exists(path):
+        #left from an earlier sweep, the shards of this one start close enough together to read the same history
+        os.replace(tmp_path, path)
+        return assignment, path
+    try:
+        #link fails when another shard wrote its plan first, then that one is used
+        os.link(tmp_path, path)
+    except FileExistsError:
+        assignment = _load_plan(path, keys) or assignment
+    finally:
+        os.remove(tmp_path)
+    return assignment, path
+
+def select_shard(paths, shard, runtimes=None, plan_dir='.'):
+    #the paths of shard (i, N), in their original order
+    if shard is None:
+        return list(paths)
+    index, count = shard
+    if runtimes:
+        assignment, plan_path = shared_plan(paths, count, runtimes, plan_dir)
+        print(f"Shard {index}/{count} balanced by earlier runtimes, plan: {plan_path}")
+    else:
+        assignment = assign_shards(paths, count)
+    return [path for path in paths if assignment[shard_key(path)] == index - 1]
+
+def shard_entries(entries, shard):
+    #select_shard for benchmark index entries, split by their .yml path
+    chosen = set(select_shard([entry['yml_path'] for entry in entries], shard))
+    return [entry for entry in entries if entry['yml_path'] in chosen]
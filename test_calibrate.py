@@ -0,0 +1,22 @@
+import numpy as np
+from calibrate import summarize, area_under
+
+def test_perfect_classifier_has_full_roc_auc():
+    #every safe row scores below every buggy one, so some threshold separates them exactly
+    scores = np.array([0.1, 0.2, 0.3, 0.7, 0.8, 0.9])
+    expected = np.array([True, True, True, False, False, False])
+    summary = summarize("all", scores, expected)
+    assert summary['roc_auc'] == 1.0
+    assert summary['accuracy'] == 1.0
+    assert 0.3 <= summary['threshold'] < 0.7
+
+def test_uninformative_scores_have_half_roc_auc():
+    scores = np.full(4, 0.5)
+    expected = np.array([True, False, True, False])
+    assert summarize("all", scores, expected)['roc_auc'] == 0.5
+
+def test_area_under_walks_tied_points_upwards():
+    #the order the sweep produces: highest recall first within the same false positive rate
+    x = np.array([1.0, 0.0, 0.0])
+    y = np.array([1.0, 1.0, 0.0])
+    assert area_under(x, y) == 1.0
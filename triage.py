@@ -0,0 +1,53 @@
+import json
+
+#deciding which files are worth spending CBMC time on, based only on the NN output (no expected verdicts)
+
+def uncertainty(nn_result, threshold):
+    #0 means the score sits right on the threshold, bigger means the NN is further from flipping
+    return abs(nn_result['vulnerability_score'] - threshold)
+
+def in_uncertainty_band(nn_result, band=None, min_confidence=None):
+    if band is not None:
+        low, high = band
+        if low <= nn_result['vulnerability_score'] <= high:
+            return True
+    if min_confidence is not None and nn_result['confidence'] < min_confidence:
+        return True
+    return False
+
+def escalation_order(nn_results, threshold, band=None, min_confidence=None, budget=None):
+    #indices of the files to send to CBMC, most uncertain first
+    #with a budget every file is a candidate and the caller stops once the budget is spent
+    if budget is not None:
+        candidates = list(range(len(nn_results)))
+    else:
+        candidates = [i for i, nn_result in enumerate(nn_results)
+                      if in_uncertainty_band(nn_result, band, min_confidence)]
+    return sorted(candidates, key=lambda i: uncertainty(nn_results[i], threshold))
+
+def accuracy_curve(escalated, nn_correct, combined_correct, cbmc_seconds, total):
+    #accuracy if we had stopped after the first k escalations, for k = 0..len(escalated)
+    #nn_correct/combined_correct map a file to its number of correct properties without/with CBMC
+    correct = sum(nn_correct.values())
+    spent = 0.0
+    curve = [(0, 0.0, correct / total if total else 0.0)]
+    for k, name in enumerate(escalated, start=1):
+        correct += combined_correct[name] - nn_correct[name]
+        spent += cbmc_seconds[name]
+        curve.append((k, spent, correct / total if total else 0.0))
+    return curve
+
+def sample_curve(curve, points=20):
+    #evenly spaced rows for the report, always keeping the first and last point
+    if len(curve) <= points:
+        return curve
+    step = (len(curve) - 1) / (points - 1)
+    return [curve[round(i * step)] for i in range(points)]
+
+def load_threshold(default, path='calibration.json'):
+    #best overall threshold written by calibrate.py, or the default when no calibration has been run
+    try:
+        with open(path, 'r') as f:
+            return float(json.load(f)['threshold'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return default
@@ -0,0 +1,82 @@
+import time
+from cbmc_output import text_outcome, parse_json_ui
+from verifier_process import run_command
+
+#iterative deepening of the CBMC unwind bound, shared by CBMC.py and NN+CBMC.py
+#starts with a small bound and grows it geometrically until CBMC either finds a real counterexample or
+#proves the program with all unwinding assertions passing, all rounds share one overall timeout
+start_unwind = 2
+unwind_factor = 2
+max_unwind = 1024
+
+def only_unwinding_failures(failures):
+    #failed only because the bound was too small, not because of a real counterexample
+    return bool(failures) and all('unwinding assertion' in failure for failure in failures)
+
+def simple_run(cmd, timeout):
+    #no limits of its own, but a timed out round is still killed with its whole process group
+    return run_command(cmd, timeout)
+
+def structured_run(cmd, timeout):
+    #simple_run for --json-ui, stdout comes back as the JsonUiParser summary to go with json_outcome
+    returncode, stdout, stderr, status = simple_run(cmd, timeout)
+    return returncode, parse_json_ui(stdout), stderr, status
+
+def without_unwind(flags):
+    #drop any fixed --unwind bound, deepening sets its own
+    cleaned = []
+    skip = False
+    for flag in flags:
+        if skip:
+            skip = False
+            continue
+        if flag == '--unwind':
+            skip = True
+            continue
+        cleaned.append(flag)
+    if '--unwinding-assertions' not in cleaned:
+        #without unwinding assertions a pass at a small bound wouldn't prove anything
+        cleaned.append('--unwinding-assertions')
+    return cleaned
+
+def run_deepening(c_file, flags, timeout, run=simple_run, start=start_unwind, factor=unwind_factor,
+                  limit=max_unwind, outcome=text_outcome):
+    #returns (verdict, output, rounds), verdict is SUCCESS, FAILURE, TIMEOUT, MEMOUT or UNKNOWN (bound limit reached)
+    #rounds is a list of {'unwind', 'time', 'outcome'} so the report can show where the solver time went
+    #outcome reads a round's (stdout, stderr), json_outcome when run parses --json-ui output into a summary
+    flags = without_unwind(flags)
+    deadline = time.time() + timeout
+    rounds = []
+    unwind = start
+    output = ''
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return 'TIMEOUT', output, rounds
+        cmd = ['cbmc', c_file, '--unwind', str(unwind)] + flags
+        print(f"\nRunning (unwind {unwind}, {remaining:.0f}s left): {' '.join(cmd)}")
+        round_start = time.time()
+        #each round may use whatever budget the earlier rounds left
+        returncode, stdout, stderr, status = run(cmd, remaining)
+        round_time = time.time() - round_start
+        verdict, failures, output = outcome(stdout, stderr)
+        if status != 'done':
+            rounds.append({'unwind': unwind, 'time': round_time, 'outcome': status.upper()})
+            return status.upper(), output, rounds
+        if verdict == 'SUCCESS':
+            rounds.append({'unwind': unwind, 'time': round_time, 'outcome': 'SUCCESS'})
+            return 'SUCCESS', output, rounds
+        if verdict == 'FAILURE' and not only_unwinding_failures(failures):
+            rounds.append({'unwind': unwind, 'time': round_time, 'outcome': 'FAILURE'})
+            return 'FAILURE', output, rounds
+        if verdict != 'FAILURE':
+            #crashed or printed something unexpected, a bigger bound won't help
+            rounds.append({'unwind': unwind, 'time': round_time, 'outcome': 'UNKNOWN'})
+            return 'UNKNOWN', output, rounds
+        rounds.append({'unwind': unwind, 'time': round_time, 'outcome': 'DEEPEN'})
+        if unwind >= limit:
+            return 'UNKNOWN', output, rounds
+        unwind = min(limit, unwind * factor)
+
+def rounds_summary(rounds):
+    return ", ".join(f"{r['unwind']}: {r['time']:.2f}s {r['outcome']}" for r in rounds)
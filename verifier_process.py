@@ -0,0 +1,230 @@
+import os
+import time
+import codecs
+import signal
+import resource
+import itertools
+import subprocess
+import threading
+from functools import lru_cache
+
+#runs one verifier process (cbmc, cpa.sh and the JVM it starts) in its own session, with its limits applied,
+#and takes the whole process tree down on a timeout, shared by CBMC.py and unwinding.py
+#limits are {'cpu': seconds, 'mem': MB}, either may be None
+#with a writable cgroup v2 hierarchy that has the memory controller every run also gets its own cgroup:
+#memory.max caps the whole tree (RLIMIT_AS only caps each process, and can't be used on the JVM at all),
+#memory.peak and the oom_kill count tell a memory-out apart from a crash, and cgroup.kill also reaches
+#processes that left the session
+use_cgroups = True
+#what verifiers print when an allocation fails under RLIMIT_AS, for telling MEMOUT from a crash without cgroups
+memout_markers = ('Out of memory', 'std::bad_alloc', 'java.lang.OutOfMemoryError', 'Cannot allocate memory')
+#seconds the output readers may take past the deadline, a process that left the session can hold the pipes
+#open for as long as it likes and run_command doesn't wait on it
+reader_grace = 1
+
+_run_ids = itertools.count()
+
+def apply_limits(pid, limits, address_space=True):
+    #caps cpu time and memory of an already started verifier process
+    #done with prlimit instead of a preexec_fn, which isn't safe once portfolio threads are running
+    if not limits:
+        return
+    cpu = limits.get('cpu')
+    mem = limits.get('mem')
+    try:
+        if cpu is not None:
+            resource.prlimit(pid, resource.RLIMIT_CPU, (int(cpu), int(cpu) + 5))
+        if mem is not None and address_space:
+            mem_bytes = int(mem) * 1024 * 1024
+            resource.prlimit(pid, resource.RLIMIT_AS, (mem_bytes, mem_bytes))
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def hit_cpu_limit(returncode, limits):
+    #RLIMIT_CPU sends SIGXCPU and then SIGKILL once the hard limit is reached
+    if not limits or limits.get('cpu') is None:
+        return False
+    return returncode in (-signal.SIGXCPU, -signal.SIGKILL)
+
+def kill_process_group(proc, grace=2):
+    #the verifier runs in its own session, so this also takes down children like the JVM behind cpa.sh
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            proc.wait(timeout=grace)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+@lru_cache(maxsize=None)
+def cgroup_parent():
+    #a cgroup v2 directory per-run cgroups with the memory controller can be created in, None when there's none
+    #this process first moves into a leaf of its own cgroup, since a cgroup that hands controllers down to its
+    #children can't hold processes itself
+    if not use_cgroups:
+        return None
+    mount = None
+    for line in (_read('/proc/self/mounts') or '').splitlines():
+        fields = line.split()
+        if len(fields) > 2 and fields[2] == 'cgroup2':
+            mount = fields[1]
+            break
+    own = [line[3:] for line in (_read('/proc/self/cgroup') or '').splitlines() if line.startswith('0::')]
+    if mount is None or not own:
+        return None
+    base = os.path.join(mount, own[0].strip().lstrip('/'))
+    if 'memory' not in (_read(os.path.join(base, 'cgroup.controllers')) or '').split():
+        return None
+    try:
+        if 'memory' not in (_read(os.path.join(base, 'cgroup.subtree_control')) or '').split():
+            leaf = os.path.join(base, f"verifier-main-{os.getpid()}")
+            os.makedirs(leaf, exist_ok=True)
+            _write(os.path.join(leaf, 'cgroup.procs'), str(os.getpid()))
+            _write(os.path.join(base, 'cgroup.subtree_control'), '+memory')
+    except OSError:
+        #not delegated to us, or other processes share the cgroup, rlimits alone have to do
+        return None
+    return base
+
+def make_cgroup(limits):
+    #a fresh cgroup for one run, None when cgroups aren't usable
+    parent = cgroup_parent()
+    if parent is None:
+        return None
+    path = os.path.join(parent, f"verifier-{os.getpid()}-{next(_run_ids)}")
+    try:
+        os.mkdir(path)
+        mem = (limits or {}).get('mem')
+        if mem is not None:
+            _write(os.path.join(path, 'memory.max'), str(int(mem) * 1024 * 1024))
+            if os.path.exists(os.path.join(path, 'memory.swap.max')):
+                _write(os.path.join(path, 'memory.swap.max'), '0')
+    except OSError:
+        return None
+    return path
+
+def cgroup_usage(path):
+    #(peak memory in KB, oom kills) of a finished run's cgroup
+    peak = _read(os.path.join(path, 'memory.peak'))
+    oom_kills = 0
+    for line in (_read(os.path.join(path, 'memory.events')) or '').splitlines():
+        name, _, value = line.partition(' ')
+        if name == 'oom_kill':
+            oom_kills = int(value)
+    return (int(peak) // 1024 if peak and peak.strip().isdigit() else None), oom_kills
+
+def remove_cgroup(path):
+    #kills whatever is still in the cgroup, even processes that started their own session, then removes it
+    if os.path.exists(os.path.join(path, 'cgroup.kill')):
+        try:
+            _write(os.path.join(path, 'cgroup.kill'), '1')
+        except OSError:
+            pass
+    for _ in range(50):
+        try:
+            os.rmdir(path)
+            return
+        except FileNotFoundError:
+            return
+        except OSError:
+            time.sleep(0.02)
+
+def _drain(stream, sink):
+    #read1 hands over whatever has been written so far, so the output up to a cut off reader isn't lost
+    decoder = codecs.getincrementaldecoder(stream.encoding)(stream.errors)
+    for block in iter(lambda: stream.buffer.read1(1 << 16), b''):
+        text = decoder.decode(block)
+        if text:
+            sink(text)
+    text = decoder.decode(b'', final=True)
+    if text:
+        sink(text)
+
+def run_command(cmd, timeout, limits=None, address_space=True, cancel=None, poll_interval=0.2, env=None, usage=None,
+                stdout_sink=None):
+    #returns (returncode, stdout, stderr, status) where status is 'done', 'timeout', 'memout' or 'cancelled'
+    #usage, when given, is filled with 'spawn', 'wall' and 'cpu' seconds and 'peak_rss_kb' of the process
+    #stdout_sink, when given, gets stdout chunk by chunk as it is written instead, stdout then comes back empty
+    #the process is reaped with wait4 so its CPU time and peak RSS are its own, not those of every child so far
+    #address_space=False leaves out RLIMIT_AS (the JVM reserves far more than it uses), a cgroup still caps it
+    cgroup = make_cgroup(limits)
+    if cgroup is not None:
+        #the shell joins the cgroup before it becomes the verifier, so no child can start outside it
+        cmd = ['/bin/sh', '-c', 'echo $$ > "$0" 2>/dev/null; exec "$@"',
+               os.path.join(cgroup, 'cgroup.procs')] + list(cmd)
+        address_space = False
+    spawn_start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True,
+                            env=env)
+    started = time.perf_counter()
+    apply_limits(proc.pid, limits, address_space)
+    stdout_chunks, stderr_chunks = [], []
+    readers = [threading.Thread(target=_drain, args=(proc.stdout, stdout_sink or stdout_chunks.append), daemon=True),
+               threading.Thread(target=_drain, args=(proc.stderr, stderr_chunks.append), daemon=True)]
+    for reader in readers:
+        reader.start()
+    deadline = time.time() + timeout
+    status = 'done'
+    rusage = None
+    delay = 0.001
+    while True:
+        pid, wait_status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(wait_status)
+            break
+        if cancel is not None and cancel.is_set():
+            status = 'cancelled'
+        elif time.time() >= deadline:
+            status = 'timeout'
+        else:
+            #short sleeps first so quick runs aren't held up, then poll_interval apart
+            time.sleep(max(0, min(delay, poll_interval, deadline - time.time())))
+            delay *= 2
+            continue
+        kill_process_group(proc)
+        rusage = None
+        break
+    ended = time.perf_counter()
+    #children the verifier put in the background can outlive it, they are taken down with it
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    peak_kb, oom_kills = None, 0
+    if cgroup is not None:
+        peak_kb, oom_kills = cgroup_usage(cgroup)
+        remove_cgroup(cgroup)
+    join_deadline = max(deadline, time.time()) + reader_grace
+    for reader, stream in zip(readers, (proc.stdout, proc.stderr)):
+        reader.join(max(0, join_deadline - time.time()))
+        #a reader still blocked on the pipe holds the stream's lock, it is closed when that reader ends
+        if not reader.is_alive():
+            stream.close()
+    stdout, stderr = ''.join(stdout_chunks), ''.join(stderr_chunks)
+    if status == 'done' and proc.returncode != 0 and limits and limits.get('mem') is not None:
+        #an OOM kill inside the cgroup, or an allocation refused under RLIMIT_AS
+        if oom_kills or any(marker in stderr or marker in stdout for marker in memout_markers):
+            status = 'memout'
+    if usage is not None:
+        usage['spawn'] = started - spawn_start
+        usage['wall'] = ended - started
+        if rusage is not None:
+            usage['cpu'] = rusage.ru_utime + rusage.ru_stime
+            usage['peak_rss_kb'] = rusage.ru_maxrss
+        if peak_kb is not None:
+            usage['peak_rss_kb'] = max(usage.get('peak_rss_kb', 0), peak_kb)
+    return proc.returncode, stdout, stderr, status